@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from posts.models import Comment, Follow, Post
+from tests.utils import assert_max_queries, count_queries
+
+pytestmark = [pytest.mark.django_db]
+
+# SQL budget of every page, not counting session and user lookups
+# of the authorized client
+QUERY_BUDGETS = {
+    'index': 1,
+    'group': 1,
+    'profile': 2,
+    'post_detail': 2,
+    'follow': 2,
+}
+AUTH_QUERIES = 2
+
+
+def grow(mixer, user, group, post, size):
+    for author in mixer.cycle(size).blend(get_user_model()):
+        mixer.blend(Follow, user=user, author=author)
+        mixer.cycle(2).blend(Post, author=author, group=group, image='')
+    mixer.cycle(size).blend(Post, author=post.author, group=group, image='')
+    mixer.cycle(size).blend(Comment, post=post, author=mixer.SELECT)
+
+
+class TestQueryBudget:
+
+    @pytest.fixture
+    def post(self, user, group):
+        return Post.objects.create(text='Тестовый пост', author=user, group=group)
+
+    def urls(self, post):
+        return {
+            'index': '/',
+            'group': f'/group/{post.group.slug}/',
+            'profile': f'/profile/{post.author.username}/',
+            'post_detail': f'/posts/{post.id}/',
+            'follow': '/follow/',
+        }
+
+    def test_pages_fit_query_budget(self, mixer, user_client, user, post):
+        for name, url in self.urls(post).items():
+            limit = QUERY_BUDGETS[name] + AUTH_QUERIES
+            with assert_max_queries(limit):
+                count_queries(user_client, url)
+
+    def test_query_count_does_not_grow_with_data(self, mixer, user_client, user, post):
+        urls = self.urls(post)
+        mixer.blend(Comment, post=post, author=user)
+        before = {name: count_queries(user_client, url) for name, url in urls.items()}
+
+        grow(mixer, user, post.group, post, 12)
+
+        for name, url in urls.items():
+            after = count_queries(user_client, url)
+            assert after == before[name], (
+                f'Количество SQL-запросов страницы `{url}` выросло '
+                f'с {before[name]} до {after} вместе с объёмом данных'
+            )
@@ -1,5 +1,31 @@
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
 def get_field_from_context(context, field_type):
     for field in context.keys():
         if field not in ('user', 'request') and isinstance(context[field], field_type):
             return context[field]
     return
+
+
+@contextmanager
+def assert_max_queries(limit, using=connection):
+    with CaptureQueriesContext(using) as context:
+        yield context
+    executed = '\n'.join(query['sql'] for query in context.captured_queries)
+    assert len(context) <= limit, (
+        f'Ожидалось не больше {limit} SQL-запросов, выполнено {len(context)}:\n{executed}'
+    )
+
+
+def count_queries(client, url):
+    for cache in caches.all():
+        cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    return len(context)
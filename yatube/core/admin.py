@@ -0,0 +1,43 @@
+from django import forms
+from django.contrib import admin
+
+from .paginator import EstimatedCountPaginator
+
+
+class PerformanceModelAdmin(admin.ModelAdmin):
+    """Changelist for large tables.
+
+    Counts come from the table statistics, the total is not counted a
+    second time for filtered lists, and each editable foreign key loads
+    its choices once per page instead of once per row. Joins still have
+    to be listed in ``list_select_related``.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+        formset.form = type(formset.form.__name__, (formset.form,), {
+            '__init__': cached_choices_init(formset.form.__init__, {}),
+        })
+        return formset
+
+
+def cached_choices_init(init, choices):
+    """Share the choices of model choice fields between all rows."""
+
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        for name, field in self.fields.items():
+            if not isinstance(field, forms.ModelChoiceField):
+                continue
+            if name not in choices:
+                choices[name] = list(field.choices)
+            field.choices = choices[name]
+            # the admin wraps the select to add the "+" link
+            widget = getattr(field.widget, 'widget', None)
+            if widget is not None:
+                widget.choices = choices[name]
+
+    return __init__
@@ -0,0 +1,39 @@
+"""Checks that entries every worker must agree on are not cached per
+process."""
+from django.conf import settings
+from django.core import checks
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+
+CACHED_SESSION_ENGINES = ('django.contrib.sessions.backends.cache',
+                          'django.contrib.sessions.backends.cached_db')
+
+
+def shared_aliases():
+    """Cache aliases that must be shared, with the settings naming them."""
+    aliases = [(settings.FEED_VERSION_CACHE_ALIAS, 'FEED_VERSION_CACHE_ALIAS')]
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        aliases.append((settings.SESSION_CACHE_ALIAS, 'SESSION_CACHE_ALIAS'))
+    if 'users.backends.CachedModelBackend' in settings.AUTHENTICATION_BACKENDS:
+        aliases.append((settings.USER_CACHE_ALIAS, 'USER_CACHE_ALIAS'))
+    return aliases
+
+
+@checks.register('caches')
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    for alias, setting in shared_aliases():
+        config = settings.CACHES.get(alias)
+        if config is None:
+            errors.append(checks.Error(
+                f'{setting}: кэш «{alias}» не настроен в CACHES.',
+                id='core.E001'))
+        elif issubclass(import_string(config['BACKEND']), LocMemCache):
+            errors.append(checks.Error(
+                f'{setting}: кэш «{alias}» хранится в памяти процесса.',
+                hint='Изменения, сделанные одним процессом, не увидят '
+                     'остальные; нужен общий кэш, например FileBasedCache '
+                     'или Memcached.',
+                id='core.E002'))
+    return errors
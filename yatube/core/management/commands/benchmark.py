@@ -0,0 +1,231 @@
+import json
+import math
+import platform
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+NAMESPACES = ('posts', 'users', 'about')
+QUERY_STRINGS = {'posts:search': 'q=книга'}
+
+
+def percentile(timings, number):
+    """Nearest-rank percentile of sorted ``timings``, in milliseconds."""
+    rank = max(math.ceil(number / 100 * len(timings)), 1)
+    return round(timings[rank - 1] * 1000, 3)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99 времени ответа, число запросов к базе и '
+            'выделения памяти для всех страниц posts, users и about. '
+            'Страницы подписки меняют данные, запускайте на тестовой базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Число замеров на страницу')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare',
+                            help='JSON предыдущего запуска для сравнения')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Число одновременных клиентов для замера '
+                                 'пропускной способности')
+        parser.add_argument('--only', nargs='*', default=(),
+                            help='Имена страниц, например posts:index')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('Для перцентилей нужно хотя бы 2 замера')
+        try:
+            # measure what production runs, without the debug toolbar
+            setup_test_environment(debug=False)
+        except RuntimeError:
+            # already running inside the test runner
+            own_environment = False
+        else:
+            own_environment = True
+        try:
+            results = {
+                view_name: self.measure(url, login, options)
+                for view_name, url, login in self.urls(options['only'])
+            }
+        finally:
+            if own_environment:
+                teardown_test_environment()
+
+        report = {'meta': self.meta(options), 'results': results}
+        dump = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(dump)
+        self.print_table(results)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.print_diff(json.load(previous)['results'], results)
+
+    def fixtures(self):
+        post = (Post.objects.annotate(total=Count('comments'))
+                .order_by('-total', '-pk').first())
+        group = Group.objects.annotate(total=Count('posts')).order_by(
+            '-total').first()
+        user = (User.objects.annotate(total=Count('following'))
+                .order_by('-total').first())
+        if post is None or group is None or user is None:
+            raise CommandError('База пуста, запустите seed_benchmark')
+        # the biggest thread for the collapsed replies fragment
+        comment = post.comments.order_by('-replies_count', 'path').first()
+        reader = (User.objects.filter(pk__in=Follow.objects.values('user'))
+                  .annotate(total=Count('follower')).order_by('-total')
+                  .first()) or user
+        return {
+            'slug': group.slug,
+            'username': user.username,
+            'post_id': post.pk,
+            'comment_id': comment.pk if comment else 0,
+            'table': 'posts',
+            'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+            'token': default_token_generator.make_token(reader),
+        }, reader
+
+    def urls(self, only):
+        """Every GET-able page of the namespaces with real arguments."""
+        kwargs, reader = self.fixtures()
+        self.reader = reader
+        resolver = get_resolver()
+        for namespace in NAMESPACES:
+            _, urls = resolver.namespace_dict[namespace]
+            for pattern in urls.url_patterns:
+                view_name = f'{namespace}:{pattern.name}'
+                if only and view_name not in only:
+                    continue
+                names = pattern.pattern.regex.groupindex
+                url = reverse(view_name,
+                              kwargs={name: kwargs[name] for name in names})
+                if view_name in QUERY_STRINGS:
+                    url = f'{url}?{QUERY_STRINGS[view_name]}'
+                yield view_name, url, self.needs_login(url)
+
+    def needs_login(self, url):
+        response = Client().get(url)
+        return (response.status_code == 302
+                and 'login' in response.get('Location', ''))
+
+    def measure(self, url, login, options):
+        threads = options['threads']
+        if threads == 1:
+            runs = [self.run(url, login, options)]
+        else:
+            barrier = threading.Barrier(threads)
+            with ThreadPoolExecutor(threads) as pool:
+                runs = list(pool.map(
+                    lambda _: self.run(url, login, options, barrier),
+                    range(threads)))
+        timings = [timing for run in runs for timing in run['timings']]
+        elapsed = (max(run['finished'] for run in runs)
+                   - min(run['started'] for run in runs))
+
+        client = Client()
+        if login:
+            client.force_login(self.reader)
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'url': url,
+            'login': login,
+            'status': runs[0]['status'],
+            'threads': threads,
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': max(run['queries'] for run in runs),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def run(self, url, login, options, barrier=None):
+        """One client: warm up, then time ``repeat`` requests."""
+        client = Client()
+        timings, queries = [], 0
+        try:
+            for iteration in range(options['warmup'] + options['repeat']):
+                if iteration == options['warmup']:
+                    if barrier is not None:
+                        barrier.wait()
+                    started = time.perf_counter()
+                if login and '_auth_user_id' not in client.session:
+                    client.force_login(self.reader)
+                with CaptureQueriesContext(connection) as captured:
+                    begin = time.perf_counter()
+                    response = client.get(url)
+                    timing = time.perf_counter() - begin
+                if iteration >= options['warmup']:
+                    timings.append(timing)
+                    queries = max(queries, len(captured))
+        finally:
+            if barrier is not None:
+                # every worker thread opened its own connection
+                connection.close()
+        return {
+            'timings': timings,
+            'queries': queries,
+            'status': response.status_code,
+            'started': started,
+            'finished': time.perf_counter(),
+        }
+
+    def meta(self, options):
+        return {
+            'date': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'threads': options['threads'],
+            'rows': {model.__name__: model.objects.count()
+                     for model in (User, Group, Post, Comment, Follow)},
+        }
+
+    def print_table(self, results):
+        self.stdout.write(f'{"страница":<32}{"p50":>9}{"p95":>9}{"p99":>9}'
+                          f'{"зап/с":>9}{"SQL":>6}{"КиБ":>9}')
+        for view_name, row in results.items():
+            self.stdout.write(
+                f'{view_name:<32}{row["p50_ms"]:>9}{row["p95_ms"]:>9}'
+                f'{row["p99_ms"]:>9}{row["rps"]:>9}{row["queries"]:>6}'
+                f'{row["peak_kib"]:>9}')
+
+    def print_diff(self, previous, results):
+        self.stdout.write('\nИзменения относительно предыдущего запуска:')
+        for view_name, row in results.items():
+            old = previous.get(view_name)
+            if old is None:
+                continue
+            change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            self.stdout.write(
+                f'{view_name:<32}p95 {change:+.1f}%  '
+                f'зап/с {old.get("rps")} -> {row["rps"]}  '
+                f'SQL {old["queries"]} -> {row["queries"]}')
@@ -0,0 +1,221 @@
+"""Per-view request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` opens a ``RequestStats`` for every request; the
+database wrapper, the template backend and the cache backend below add to
+it, and the totals are folded into ``registry`` once the response is
+ready. Metrics live in process memory, so every worker exposes its own.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache.backends import filebased, locmem
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MISSING = object()
+
+_local = threading.local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = []
+        self.db_seconds = 0
+        self.template_seconds = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.paused = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db_seconds += duration
+            self.queries.append((sql, duration))
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.statuses = defaultdict(int)
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.seconds = 0
+        self.queries = 0
+        self.db_seconds = 0
+        self.template_seconds = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, status, seconds, stats):
+        self.statuses[status] += 1
+        for number, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[number] += 1
+        self.count += 1
+        self.seconds += seconds
+        self.queries += len(stats.queries)
+        self.db_seconds += stats.db_seconds
+        self.template_seconds += stats.template_seconds
+        self.cache_hits += stats.cache_hits
+        self.cache_misses += stats.cache_misses
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+
+    def observe(self, view_name, status, seconds, stats):
+        with self.lock:
+            self.views[view_name].observe(status, seconds, stats)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        with self.lock:
+            views = sorted(self.views.items())
+            return '\n'.join(exposition(views)) + '\n'
+
+
+def family(name, kind, description):
+    yield f'# HELP yatube_{name} {description}'
+    yield f'# TYPE yatube_{name} {kind}'
+
+
+def histogram(views):
+    yield from family('request_duration_seconds', 'histogram',
+                      'Request latency by view.')
+    for view, metric in views:
+        for bound, count in zip(BUCKETS, metric.buckets):
+            yield (f'yatube_request_duration_seconds_bucket'
+                   f'{{view="{view}",le="{bound}"}} {count}')
+        yield (f'yatube_request_duration_seconds_bucket'
+               f'{{view="{view}",le="+Inf"}} {metric.count}')
+        yield (f'yatube_request_duration_seconds_sum{{view="{view}"}} '
+               f'{metric.seconds}')
+        yield (f'yatube_request_duration_seconds_count{{view="{view}"}} '
+               f'{metric.count}')
+
+
+def exposition(views):
+    yield from histogram(views)
+
+    yield from family('requests_total', 'counter',
+                      'Responses by view and status code.')
+    for view, metric in views:
+        for status, count in sorted(metric.statuses.items()):
+            yield (f'yatube_requests_total'
+                   f'{{view="{view}",status="{status}"}} {count}')
+
+    totals = (
+        ('db_queries_total', 'queries', 'Database queries by view.'),
+        ('db_query_seconds_total', 'db_seconds',
+         'Time spent in database queries by view.'),
+        ('template_render_seconds_total', 'template_seconds',
+         'Time spent rendering templates by view.'),
+    )
+    for name, attr, description in totals:
+        yield from family(name, 'counter', description)
+        for view, metric in views:
+            yield f'yatube_{name}{{view="{view}"}} {getattr(metric, attr)}'
+
+    yield from family('cache_requests_total', 'counter',
+                      'Cache reads by view and result.')
+    for view, metric in views:
+        yield (f'yatube_cache_requests_total{{view="{view}",result="hit"}} '
+               f'{metric.cache_hits}')
+        yield (f'yatube_cache_requests_total{{view="{view}",result="miss"}} '
+               f'{metric.cache_misses}')
+
+    yield from family('cache_hit_ratio', 'gauge',
+                      'Share of cache reads that were hits, by view.')
+    for view, metric in views:
+        reads = metric.cache_hits + metric.cache_misses
+        if reads:
+            yield (f'yatube_cache_hit_ratio{{view="{view}"}} '
+                   f'{metric.cache_hits / reads}')
+
+
+registry = Registry()
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats = current()
+            if stats is not None:
+                stats.template_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Django template backend reporting render time to the metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class InstrumentedCacheMixin:
+    """Count cache hits and misses of the current request."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version=version)
+        stats = current()
+        if stats is not None and not stats.paused:
+            if value is MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        stats = current()
+        if stats is None or stats.paused:
+            return super().get_many(keys, version=version)
+        # the default implementation goes through get()
+        stats.paused = True
+        try:
+            values = super().get_many(keys, version=version)
+        finally:
+            stats.paused = False
+        stats.cache_hits += len(values)
+        stats.cache_misses += len(keys) - len(values)
+        return values
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    pass
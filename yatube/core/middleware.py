@@ -0,0 +1,46 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Record latency, SQL, template and cache metrics per view name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        metrics.registry.observe(view_name, response.status_code, elapsed,
+                                 stats)
+        if elapsed >= settings.SLOW_REQUEST_THRESHOLD:
+            self.log_slow(request, view_name, elapsed, stats)
+        return response
+
+    def log_slow(self, request, view_name, elapsed, stats):
+        queries = '\n'.join(f'  {duration * 1000:.1f} мс: {sql}'
+                            for sql, duration in stats.queries)
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f мс, SQL: %d за %.0f мс\n%s',
+            request.method, request.get_full_path(), view_name,
+            elapsed * 1000, len(stats.queries), stats.db_seconds * 1000,
+            queries)
@@ -0,0 +1,153 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator over ``ordering``.
+
+    Pages are addressed by opaque ``after``/``before`` cursors holding the
+    ordering values of the boundary row, so neither ``COUNT(*)`` nor
+    ``OFFSET`` is ever issued and page N costs the same as the first page.
+    All ordering fields share one direction and the last one must be unique.
+    Ordering may use annotations, e.g. a search rank, and the rows may be
+    ``values()`` dicts as long as they include the ordering fields.
+    The returned page is a plain ``Page`` with ``next_cursor`` and
+    ``previous_cursor`` attributes.
+    """
+
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list, per_page)
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        self.num_pages = 1
+
+    def get_page(self, after=None, before=None):
+        after, before = self.decode(after), self.decode(before)
+        backwards = after is None and before is not None
+        position = before if backwards else after
+        rows = self.fetch(position, forward=not backwards)
+
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and position is not None:
+            return self.get_page()
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = position is not None, more
+
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.previous_cursor = self.encode(rows[0]) if has_previous else None
+        page.next_cursor = self.encode(rows[-1]) if has_next else None
+        return page
+
+    def fetch(self, position, forward):
+        return list(self.page_queryset(position, forward))
+
+    def page_queryset(self, position=None, forward=True):
+        descending = self.descending == forward
+        queryset = self.object_list
+        if position is not None:
+            queryset = queryset.filter(self.seek(position, descending))
+        ordering = [('-' if descending else '') + field
+                    for field in self.fields]
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def seek(self, position, descending):
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.fields, position):
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def model_fields(self):
+        opts = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        return [annotations[field].output_field if field in annotations
+                else opts.get_field(field) for field in self.fields]
+
+    def encode(self, row):
+        """Cursor of a model instance or a ``values()`` row."""
+        values = [row[name] if isinstance(row, dict) else getattr(row, name)
+                  for name in self.fields]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in values]
+        token = base64.urlsafe_b64encode(json.dumps(values).encode())
+        return token.decode().rstrip('=')
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)))
+            fields = self.model_fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                return None
+            return [field.to_python(value)
+                    for field, value in zip(fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+
+# vendor -> query returning the planner's row estimate for a table
+ROW_ESTIMATES = {
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class '
+                  'WHERE oid = %s::regclass',
+    'mysql': 'SELECT table_rows FROM information_schema.tables '
+             'WHERE table_schema = DATABASE() AND table_name = %s',
+    # filled in by ANALYZE, the first number is the row count
+    'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+}
+
+
+def estimated_count(model, using='default'):
+    """Row count of ``model``'s table from the statistics, or None."""
+    connection = connections[using]
+    sql = ROW_ESTIMATES.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator taking the size of a large unfiltered table from the
+    database statistics instead of ``COUNT(*)``.
+
+    Filtered querysets, and tables below ``threshold`` rows, are counted
+    exactly. The estimate only moves the last page number.
+    """
+
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
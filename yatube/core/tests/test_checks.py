@@ -0,0 +1,47 @@
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import SimpleTestCase, override_settings
+
+from posts import cache as feed_cache
+
+from ..checks import check_shared_caches
+
+PER_PROCESS = {
+    'default': {'BACKEND': 'core.metrics.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+class SharedCacheTests(SimpleTestCase):
+    def test_configured_caches_pass(self):
+        self.assertEqual(check_shared_caches(None), [])
+
+    @override_settings(CACHES=PER_PROCESS)
+    def test_per_process_cache_is_refused(self):
+        self.assertEqual([error.id for error in check_shared_caches(None)],
+                         ['core.E002'] * 3)
+
+    @override_settings(
+        CACHES=PER_PROCESS,
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+        FEED_VERSION_CACHE_ALIAS='missing')
+    def test_uncached_sessions_and_users_need_no_shared_cache(self):
+        self.assertEqual([error.id for error in check_shared_caches(None)],
+                         ['core.E001'])
+
+    @override_settings(FEED_VERSION_CACHE_ALIAS='missing')
+    def test_missing_cache_is_refused(self):
+        self.assertEqual([error.id for error in check_shared_caches(None)],
+                         ['core.E001'])
+
+    def test_versions_bumped_by_another_worker_are_seen(self):
+        shared = caches['shared']
+        # a cache instance of its own, as in another worker process
+        other_worker = FileBasedCache(shared._dir, {})
+        key = feed_cache.version_key('index', feed_cache.ALL)
+        version, = feed_cache.get_versions([key])
+
+        other_worker.incr(key)
+
+        self.assertEqual(feed_cache.get_versions([key]), [version + 1])
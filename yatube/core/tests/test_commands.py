@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user('author')
+        reader = User.objects.create_user('reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(text='Книга', author=author, group=group)
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+
+    def test_measures_every_page(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'run.json')
+            call_command('benchmark', repeat=2, warmup=0, output=output,
+                         stdout=StringIO())
+            call_command('benchmark', repeat=2, warmup=0, compare=output,
+                         only=['posts:index'], stdout=StringIO())
+            with open(output) as report:
+                results = json.load(report)['results']
+
+        for view_name in ('posts:index', 'posts:follow_index',
+                          'users:login', 'about:tech'):
+            with self.subTest(view_name=view_name):
+                row = results[view_name]
+                self.assertEqual(row['status'], 200)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+                self.assertGreater(row['rps'], 0)
+        self.assertTrue(results['posts:follow_index']['login'])
+        self.assertGreater(results['posts:post_detail']['queries'], 0)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+        Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        return response.content.decode()
+
+    def test_records_view_metrics(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        text = self.scrape()
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 2', text)
+        self.assertIn('yatube_requests_total'
+                      '{view="posts:index",status="200"} 2', text)
+        self.assertIn('yatube_cache_requests_total'
+                      '{view="posts:index",result="hit"}', text)
+        index = metrics.registry.views['posts:index']
+        self.assertGreater(index.queries, 0)
+        self.assertGreater(index.template_seconds, 0)
+        self.assertGreater(index.cache_hits, 0)
+        self.assertGreater(index.cache_misses, 0)
+
+    def test_unresolved_requests_are_grouped(self):
+        self.client.get('/noexist-page/')
+
+        self.assertIn('yatube_requests_total'
+                      '{view="unresolved",status="404"} 1', self.scrape())
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(reverse('posts:profile', args=('author',)))
+
+        self.assertIn('posts:profile', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_endpoint_is_internal(self):
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
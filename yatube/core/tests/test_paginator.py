@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts.models import Post
+
+from ..paginator import (CursorPaginator, EstimatedCountPaginator,
+                         estimated_count)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('someuser')
+        Post.objects.bulk_create(
+            Post(text=f'Текст №{num}', author=cls.user)
+            for num in range(25))
+        # half of the posts share one pub_date to check the id tie-breaker
+        Post.objects.filter(pk__in=Post.objects.values('pk')[:12]).update(
+            pub_date=timezone.now())
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def get_page(self, **cursors):
+        return CursorPaginator(Post.objects.all(), 10).get_page(**cursors)
+
+    def test_walks_forward_and_backward(self):
+        first = self.get_page()
+        self.assertFalse(first.has_previous())
+        self.assertEqual(list(first), self.expected[:10])
+
+        second = self.get_page(after=first.next_cursor)
+        self.assertEqual(list(second), self.expected[10:20])
+
+        third = self.get_page(after=second.next_cursor)
+        self.assertEqual(list(third), self.expected[20:])
+        self.assertFalse(third.has_next())
+
+        back = self.get_page(before=third.previous_cursor)
+        self.assertEqual(list(back), self.expected[10:20])
+        self.assertTrue(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_page_is_a_single_query(self):
+        cursor = self.get_page().next_cursor
+        with self.assertNumQueries(1):
+            self.get_page(after=cursor)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        for cursor in ('garbage', 'W10', '!!!'):
+            with self.subTest(cursor=cursor):
+                page = self.get_page(after=cursor)
+                self.assertEqual(list(page), self.expected[:10])
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user('someuser')
+        Post.objects.bulk_create(Post(text=f'Текст №{num}', author=user)
+                                 for num in range(30))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_estimate_comes_from_statistics(self):
+        self.assertEqual(estimated_count(Post), 30)
+
+    def test_large_table_is_not_counted(self):
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        paginator.threshold = 20
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 30)
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in queries.captured_queries))
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_filtered_and_small_tables_are_counted(self):
+        for queryset, threshold in ((Post.objects.filter(pk__lte=5), 20),
+                                    (Post.objects.all(), 1000)):
+            with self.subTest(threshold=threshold):
+                paginator = EstimatedCountPaginator(queryset, 10)
+                paginator.threshold = threshold
+                self.assertEqual(paginator.count, queryset.count())
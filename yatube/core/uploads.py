@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream every upload to a temporary file, keeping at most
+    ``settings.UPLOAD_MAX_SIZE`` bytes of it.
+
+    The rest of an oversized file is read and dropped, and ``size`` still
+    reports the full length, so forms can reject it with a clear message
+    while neither memory nor disk grow with the request body.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = self.received
+        return self.file
@@ -1,23 +1,43 @@
 from django.contrib import admin
 
+from core.admin import PerformanceModelAdmin
+
+from . import search
 from .models import Follow, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(PerformanceModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # drills down by pub_date ranges, which post_pub_date_idx serves
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.search(queryset, search_term), False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(PerformanceModelAdmin):
     list_display = ('pk', 'title')
     search_fields = ('title', 'description')
     list_filter = ('title',)
     empty_value_display = '-пусто-'
 
 
+class FollowAdmin(PerformanceModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    raw_id_fields = ('user', 'author')
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
-admin.site.register(Follow)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,219 @@
+"""Read-only JSON API over the feeds.
+
+Rows come straight from ``values()`` and go to the C JSON encoder, no
+model instances are built. Every list takes ``fields=`` to pick columns
+and ``after``/``before`` cursors; the post list also takes ``ids=``.
+"""
+import hashlib
+import json
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from core.paginator import CursorPaginator
+
+from . import timeline
+from .cache import ALL, cache_feed, get_versions, version_key
+from .models import Comment, Group, Post
+
+User = get_user_model()
+
+# public name -> lookup for values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+    'likes_count': 'likes_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'parent': 'parent_id',
+}
+POST_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('created', 'id')
+MAX_IDS = 100
+AUTOCOMPLETE_LIMIT = 20
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def json_response(payload, status=200):
+    return HttpResponse(
+        json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                   default=encode_value),
+        content_type='application/json', status=status)
+
+
+def api_view(view):
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'error': 'Не найдено'}, status=404)
+        except ApiError as error:
+            return json_response({'error': str(error)}, status=error.status)
+    return wrapper
+
+
+def selected_fields(request, available):
+    names = request.GET.get('fields')
+    if not names:
+        return list(available)
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def rows(queryset, names, available, ordering=()):
+    """``values()`` of ``names`` plus the ordering columns cursors need."""
+    lookups = {available[name] for name in names}
+    lookups.update(field.lstrip('-') for field in ordering)
+    return queryset.values(*lookups)
+
+
+def serialize(row, names, available):
+    item = {name: row[available[name]] for name in names}
+    if item.get('image'):
+        item['image'] = default_storage.url(item['image'])
+    elif 'image' in item:
+        item['image'] = None
+    return item
+
+
+def page(request, queryset, available, ordering, paginator=CursorPaginator):
+    names = selected_fields(request, available)
+    paginator = paginator(rows(queryset, names, available, ordering),
+                          settings.POSTSNUM, ordering=ordering)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
+    return page_obj, {
+        'results': [serialize(row, names, available) for row in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
+
+
+def post_page(request, queryset, paginator=CursorPaginator):
+    return page(request, queryset, POST_FIELDS, POST_ORDERING, paginator)
+
+
+@api_view
+@cache_feed(lambda: ['index'])
+def posts(request):
+    ids = request.GET.get('ids')
+    if ids is None:
+        _, payload = post_page(request, Post.objects.all())
+        return json_response(payload)
+
+    try:
+        ids = [int(pk) for pk in ids.split(',') if pk]
+    except ValueError:
+        raise ApiError('ids должен быть списком чисел через запятую')
+    if len(ids) > MAX_IDS:
+        raise ApiError(f'Не больше {MAX_IDS} записей за запрос')
+    names = selected_fields(request, POST_FIELDS)
+    found = {row['id']: serialize(row, names, POST_FIELDS)
+             for row in rows(Post.objects.filter(pk__in=ids),
+                             names + ['id'], POST_FIELDS)}
+    return json_response({'results': [found[pk] for pk in ids
+                                      if pk in found]})
+
+
+@api_view
+@cache_feed(lambda slug: [f'group:{slug}'])
+def group_posts(request, slug):
+    page_obj, payload = post_page(request,
+                                  Post.objects.filter(group__slug=slug))
+    if not page_obj:
+        get_object_or_404(Group, slug=slug)
+    return json_response(payload)
+
+
+@api_view
+@cache_feed(lambda username: [f'profile:{username}'])
+def profile_posts(request, username):
+    page_obj, payload = post_page(
+        request, Post.objects.filter(author__username=username))
+    if not page_obj:
+        get_object_or_404(User, username=username)
+    return json_response(payload)
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    _, payload = post_page(request, Post.objects.all(),
+                           partial(timeline.FeedPaginator, user=request.user))
+    return json_response(payload)
+
+
+@api_view
+def post_detail(request, post_id):
+    names = selected_fields(request, POST_FIELDS)
+    row = get_object_or_404(rows(Post.objects.all(), names, POST_FIELDS),
+                            pk=post_id)
+    return json_response(serialize(row, names, POST_FIELDS))
+
+
+@api_view
+def post_comments(request, post_id):
+    page_obj, payload = page(request, Comment.objects.filter(post_id=post_id),
+                             COMMENT_FIELDS, COMMENT_ORDERING)
+    if not page_obj:
+        get_object_or_404(Post, pk=post_id)
+    return json_response(payload)
+
+
+def prefix(field, text):
+    """``field`` starts with ``text`` as a range the index can serve."""
+    return Q(**{f'{field}__gte': text, f'{field}__lt': text + '\U0010ffff'})
+
+
+@api_view
+def group_autocomplete(request):
+    """Groups whose slug or title starts with ``q``; titles match as
+    typed or capitalized."""
+    text = request.GET.get('q', '').strip()[:50]
+    if not text:
+        return json_response({'results': []})
+    version, = get_versions([version_key('groups', ALL)])
+    key = 'posts:groups:' + hashlib.md5(
+        f'{version}:{text}'.encode()).hexdigest()
+    results = cache.get(key)
+    if results is None:
+        condition = (prefix('slug', text.lower()) | prefix('title', text)
+                     | prefix('title', text[:1].upper() + text[1:]))
+        results = list(Group.objects.filter(condition).order_by('title')
+                       .values('id', 'title', 'slug')[:AUTOCOMPLETE_LIMIT])
+        cache.set(key, results, settings.FEED_CACHE_TIMEOUT)
+    return json_response({'results': results})
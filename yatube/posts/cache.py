@@ -0,0 +1,137 @@
+"""Versioned cache of public feed pages.
+
+Anonymous renders of a feed page are cached under the version keys of the
+feeds (scopes) they belong to. Signals bump those versions, so a change
+evicts exactly the pages it shows up on instead of waiting for a TTL:
+a new post only bumps the ``head`` version, which is part of the key of
+the first page and of ``before`` pages, while edits and deletions bump the
+``all`` version, which is part of every page of the feed.
+
+The same versions make the ETags of the pages, so conditional requests
+are answered from the cache alone. Versions live in the cache named by
+``settings.FEED_VERSION_CACHE_ALIAS``, which every worker shares: a worker
+that missed a bump would keep serving its pages and answering ``304``.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+HEAD = 'head'
+ALL = 'all'
+
+
+def version_key(scope, kind):
+    return f'posts:version:{scope}:{kind}'
+
+
+def new_version():
+    return int(time.time() * 1000)
+
+
+def versions():
+    return caches[settings.FEED_VERSION_CACHE_ALIAS]
+
+
+def get_versions(keys):
+    found = versions().get_many(keys)
+    for key in keys:
+        if key not in found:
+            versions().add(key, new_version(), None)
+            found[key] = versions().get(key)
+    return [found[key] for key in keys]
+
+
+def bump(scopes, kind=ALL):
+    """Bump versions now and once more after commit, so that a page rendered
+    by a concurrent request from not yet committed data is not kept."""
+    increment(scopes, kind)
+    transaction.on_commit(lambda: increment(scopes, kind))
+
+
+def increment(scopes, kind):
+    for scope in scopes:
+        key = version_key(scope, kind)
+        try:
+            versions().incr(key)
+        except ValueError:
+            versions().set(key, new_version(), None)
+
+
+def page_key(request, scopes):
+    kinds = (ALL,) if 'after' in request.GET else (ALL, HEAD)
+    keys = [version_key(scope, kind) for scope in scopes for kind in kinds]
+    raw = ':'.join([request.get_full_path()]
+                   + [str(version) for version in get_versions(keys)])
+    return 'posts:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_feed(scopes):
+    """Cache anonymous GET renders of a feed view.
+
+    ``scopes`` maps the view kwargs to the feeds the page belongs to.
+    Pages still showing thumbnail placeholders are not cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            key = page_key(request, scopes(**kwargs))
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if (response.status_code == 200 and not response.cookies
+                        and not getattr(request, 'pending_thumbnails',
+                                        False)):
+                    cache.set(key, response, settings.FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def etag(request, scopes):
+    keys = [version_key(scope, kind) for scope in scopes
+            for kind in (ALL, HEAD)]
+    viewer = request.user.pk if request.user.is_authenticated else ''
+    raw = ':'.join([str(viewer)]
+                   + [str(version) for version in get_versions(keys)])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def conditional_feed(scopes):
+    """Answer repeat visits with 304 Not Modified before the view runs.
+
+    ``scopes`` maps the request and the view kwargs to the feeds the page
+    shows, or None when there is no such page.
+    """
+    def etag_func(request, *args, **kwargs):
+        page_scopes = scopes(request, **kwargs)
+        return None if page_scopes is None else etag(request, page_scopes)
+    return condition(etag_func=etag_func)
+
+
+def shared_cache_control(view):
+    """Let shared caches such as a CDN keep anonymous pages for
+    ``settings.CDN_CACHE_TIMEOUT``, browsers always revalidate."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if getattr(request, 'pending_thumbnails', False):
+            # the page changes once thumbnails are ready
+            for header in ('ETag', 'Last-Modified'):
+                if response.has_header(header):
+                    del response[header]
+            patch_cache_control(response, private=True, no_cache=True)
+        elif request.user.is_authenticated or response.cookies:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0,
+                                s_maxage=settings.CDN_CACHE_TIMEOUT)
+        return response
+    return wrapper
@@ -0,0 +1,129 @@
+"""Streaming export of posts, comments, groups and follows.
+
+Rows are read in primary key order with ``iterator(chunk_size=...)`` and
+encoded one at a time, so memory does not depend on the table size. The
+last exported id is the watermark for the next incremental run.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+# table -> (model, date field or None, [(column, lookup)])
+TABLES = {
+    'posts': (Post, 'pub_date', [
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('updated', 'updated'),
+        ('image', 'image'),
+    ]),
+    'comments': (Comment, 'created', [
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('parent', 'parent_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    ]),
+    'groups': (Group, None, [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('slug', 'slug'),
+        ('description', 'description'),
+    ]),
+    'follows': (Follow, None, [
+        ('id', 'id'),
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    ]),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def to_text(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class Export:
+    def __init__(self, table, format='ndjson', since=None, after_id=None,
+                 compress=False):
+        self.table = table
+        self.format = format
+        self.since = since
+        self.after_id = after_id
+        self.compress = compress
+        self.watermark = after_id
+
+    def rows(self):
+        model, date_field, columns = TABLES[self.table]
+        queryset = model.objects.order_by('id')
+        if self.after_id is not None:
+            queryset = queryset.filter(id__gt=self.after_id)
+        if self.since is not None and date_field:
+            queryset = queryset.filter(**{f'{date_field}__gte': self.since})
+        lookups = [lookup for _, lookup in columns]
+        for row in queryset.values_list(*lookups).iterator(
+                chunk_size=CHUNK_SIZE):
+            self.watermark = row[0]
+            yield [to_text(value) for value in row]
+
+    def lines(self):
+        names = [name for name, _ in TABLES[self.table][2]]
+        if self.format == 'csv':
+            writer = csv.writer(Echo())
+            yield writer.writerow(names)
+            for row in self.rows():
+                yield writer.writerow(row)
+        else:
+            for row in self.rows():
+                yield json.dumps(dict(zip(names, row)),
+                                 ensure_ascii=False) + '\n'
+
+    def chunks(self):
+        """Lines joined into chunks of about ``BUFFER_SIZE`` bytes."""
+        buffer, size = [], 0
+        for line in self.lines():
+            buffer.append(line)
+            size += len(line)
+            if size >= BUFFER_SIZE:
+                yield ''.join(buffer).encode()
+                buffer, size = [], 0
+        yield ''.join(buffer).encode()
+
+    def __iter__(self):
+        if not self.compress:
+            yield from self.chunks()
+            return
+        # wbits=31 writes a gzip header and trailer
+        compressor = zlib.compressobj(wbits=31)
+        for chunk in self.chunks():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else FORMATS[self.format]
+
+    @property
+    def filename(self):
+        name = f'{self.table}.{self.format}'
+        return f'{name}.gz' if self.compress else name
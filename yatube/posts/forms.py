@@ -1,6 +1,8 @@
 from django import forms
 
+from . import uploads
 from .models import Comment, Post
+from .widgets import GroupSelect
 
 
 class PostForm(forms.ModelForm):
@@ -16,6 +18,39 @@ class PostForm(forms.ModelForm):
             'text': 'Добавьте содержимое поста',
             'group': 'Укажите группу, к которой относится пост',
         }
+        widgets = {'group': GroupSelect}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_error = None
+        image = self.files.get(self.add_prefix('image'))
+        if image is not None:
+            self.image_error = uploads.check(image)
+        if self.image_error:
+            # keep Pillow away from files that are too big or not images
+            self.files = self.files.copy()
+            del self.files[self.add_prefix('image')]
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not getattr(image, 'image', None):
+            # nothing new was uploaded
+            return image
+        if uploads.too_large(image.image):
+            raise forms.ValidationError('Слишком большое разрешение картинки')
+        return uploads.normalize_orientation(image)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_error:
+            self.add_error('image', self.image_error)
+        return cleaned_data
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # the form field has already fetched the group by its pk
+        exclude.append('group')
+        return exclude
 
 
 class CommentForm(forms.ModelForm):
@@ -29,3 +64,15 @@ class CommentForm(forms.ModelForm):
         help_text = {
             'text': 'Добавьте комментарий'
         }
+
+    def __init__(self, *args, parent=None, **kwargs):
+        # the parent comes from the view, the only field stays the text
+        super().__init__(*args, **kwargs)
+        self.instance.parent = parent
+
+    def clean(self):
+        parent = self.instance.parent
+        if parent is not None and not parent.can_reply:
+            raise forms.ValidationError(
+                'Ветка слишком глубокая, ответьте на комментарий выше')
+        return super().clean()
@@ -0,0 +1,281 @@
+"""Bulk import of posts, comments and follows from NDJSON.
+
+Every line is one record with a ``type``::
+
+    {"type": "post", "id": 7, "author": "leo", "group": "cats",
+     "text": "...", "pub_date": "2021-11-06T15:13:00+00:00",
+     "image": "2021/cat.jpg"}
+    {"type": "comment", "id": 3, "post": 7, "author": "ann", "text": "...",
+     "created": "2021-11-06T16:00:00+00:00"}
+    {"type": "comment", "id": 4, "post": 7, "parent": 3, "author": "leo",
+     "text": "...", "created": "2021-11-06T17:00:00+00:00"}
+    {"type": "follow", "user": "ann", "author": "leo"}
+
+``id`` is optional and kept when given, which makes re-running a batch
+harmless; comments refer to posts by it, and replies to the comment they
+answer, which comes earlier in the file or is already stored. A reply
+needs its own ``id`` for its thread path. Images are paths relative to the
+image directory and land in the content-addressed post storage. Lines are
+validated and images copied by worker processes, the database is only
+written by the parent in ``bulk_create`` batches.
+"""
+import json
+import os
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.color import no_style
+from django.core.validators import validate_slug
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from . import thumbnails, uploads
+from .models import ROOT_PATH, Comment, Follow, Group, Post, path_segment
+
+User = get_user_model()
+
+RECORD_TYPES = {
+    'post': ('author', 'text'),
+    'comment': ('post', 'author', 'text'),
+    'follow': ('user', 'author'),
+}
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+@contextmanager
+def explicit_dates(model):
+    """Let bulk_create keep the dates we pass for ``model``."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def store_image(path):
+    """Copy an image into the post storage, which names it by content."""
+    try:
+        with Image.open(path) as image:
+            if uploads.too_large(image):
+                raise InvalidRecord(
+                    f'{path}: слишком большое разрешение картинки')
+            image.verify()
+            extension = IMAGE_FORMATS.get(image.format)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        extension = None
+    if extension is None:
+        raise InvalidRecord(f'{path} не является картинкой')
+
+    field = Post._meta.get_field('image')
+    with open(path, 'rb') as source:
+        return field.storage.save(f'{field.upload_to}image.{extension}',
+                                  File(source))
+
+
+def parse_date(record, field):
+    value = record.get(field)
+    if value is None:
+        return None
+    try:
+        date = parse_datetime(value)
+    except (TypeError, ValueError):
+        date = None
+    if date is None:
+        raise InvalidRecord(f'{field}: неверная дата {value!r}')
+    return date
+
+
+def check_names(record):
+    max_length = User._meta.get_field('username').max_length
+    for field in ('author', 'user'):
+        if len(str(record.get(field, ''))) > max_length:
+            raise InvalidRecord(f'{field}: слишком длинное имя')
+    if record.get('group'):
+        try:
+            validate_slug(str(record['group']))
+        except ValidationError:
+            raise InvalidRecord(f'group: неверный адрес {record["group"]!r}')
+    if record['type'] == 'follow' and record['user'] == record['author']:
+        raise InvalidRecord('нельзя подписаться на себя')
+
+
+def clean(record, image_dir):
+    if not isinstance(record, dict):
+        raise InvalidRecord('ожидался объект')
+    kind = record.get('type')
+    if kind not in RECORD_TYPES:
+        raise InvalidRecord(f'неизвестный тип {kind!r}')
+    missing = [field for field in RECORD_TYPES[kind]
+               if record.get(field) in (None, '')]
+    if missing:
+        raise InvalidRecord(f'нет полей: {", ".join(missing)}')
+    for field in ('id', 'post', 'parent'):
+        if (record.get(field) is not None
+                and not isinstance(record[field], int)):
+            raise InvalidRecord(f'{field} должен быть числом')
+    if record.get('parent') is not None and record.get('id') is None:
+        raise InvalidRecord('у ответа должен быть id')
+    check_names(record)
+
+    if kind == 'post':
+        image = record.get('image')
+        if image:
+            image = store_image(os.path.join(image_dir, image))
+        return {'type': kind, 'id': record.get('id'),
+                'author': str(record['author']),
+                'group': str(record.get('group') or '') or None,
+                'text': str(record['text']), 'image': image or '',
+                'pub_date': parse_date(record, 'pub_date')}
+    if kind == 'comment':
+        return {'type': kind, 'id': record.get('id'), 'post': record['post'],
+                'parent': record.get('parent'),
+                'author': str(record['author']), 'text': str(record['text']),
+                'created': parse_date(record, 'created')}
+    return {'type': kind, 'user': str(record['user']),
+            'author': str(record['author'])}
+
+
+def validate(task):
+    """Worker entry point: ``(number, line, image_dir)`` to a clean record
+    or an error message."""
+    number, line, image_dir = task
+    try:
+        return number, clean(json.loads(line), image_dir), None
+    except ValueError as error:
+        return number, None, f'неверный JSON: {error}'
+    except (InvalidRecord, OSError) as error:
+        return number, None, str(error)
+
+
+class Importer:
+    """Write validated records in one transaction per batch."""
+
+    def __init__(self):
+        self.counts = {'post': 0, 'comment': 0, 'follow': 0}
+        self.now = timezone.now()
+
+    def write(self, records):
+        """Store ``[(line number, record)]``, return ``[(line, error)]``."""
+        errors = []
+        with transaction.atomic():
+            users = self.users({record[field] for _, record in records
+                                for field in ('author', 'user')
+                                if field in record})
+            groups = self.groups({record['group'] for _, record in records
+                                  if record.get('group')})
+            by_type = {kind: [] for kind in self.counts}
+            for number, record in records:
+                by_type[record['type']].append((number, record))
+            self.posts(by_type['post'], users, groups)
+            errors.extend(self.comments(by_type['comment'], users))
+            self.follows(by_type['follow'], users)
+        return errors
+
+    def users(self, names):
+        known = dict(User.objects.filter(username__in=names)
+                     .values_list('username', 'pk'))
+        missing = names - known.keys()
+        if missing:
+            # imported accounts log in after a password reset
+            User.objects.bulk_create(
+                User(username=name, password=make_password(None))
+                for name in missing)
+            known.update(User.objects.filter(username__in=missing)
+                         .values_list('username', 'pk'))
+        return known
+
+    def groups(self, slugs):
+        known = dict(Group.objects.filter(slug__in=slugs)
+                     .values_list('slug', 'pk'))
+        missing = slugs - known.keys()
+        if missing:
+            Group.objects.bulk_create(
+                Group(title=slug, slug=slug, description='')
+                for slug in missing)
+            known.update(Group.objects.filter(slug__in=missing)
+                         .values_list('slug', 'pk'))
+        return known
+
+    def posts(self, records, users, groups):
+        posts = [Post(id=record['id'], author_id=users[record['author']],
+                      group_id=groups.get(record['group']),
+                      text=record['text'], image=record['image'],
+                      pub_date=record['pub_date'] or self.now,
+                      updated=record['pub_date'] or self.now)
+                 for _, record in records]
+        with explicit_dates(Post):
+            Post.objects.bulk_create(posts, ignore_conflicts=True)
+        for image in {post.image.name for post in posts if post.image}:
+            # queues new images, copies variants of known ones
+            thumbnails.enqueue(image)
+        self.counts['post'] += len(posts)
+
+    def comments(self, records, users):
+        known = set(Post.objects.filter(
+            pk__in={record['post'] for _, record in records})
+            .values_list('pk', flat=True))
+        # id -> (post, path, depth) of the comments replies may answer
+        threads = {pk: (post_id, path, depth) for pk, post_id, path, depth
+                   in Comment.objects.filter(
+                       pk__in={record['parent'] for _, record in records})
+                   .values_list('pk', 'post_id', 'path', 'depth')}
+        comments, errors = [], []
+        for number, record in records:
+            if record['post'] not in known:
+                errors.append((number, f'запись {record["post"]} не найдена'))
+                continue
+            comment = Comment(
+                id=record['id'], post_id=record['post'],
+                parent_id=record['parent'],
+                author_id=users[record['author']], text=record['text'],
+                created=record['created'] or self.now,
+                path=path_segment(record['id']) if record['id'] else '')
+            if comment.parent_id is not None:
+                post_id, path, depth = threads.get(comment.parent_id,
+                                                   (None, '', 0))
+                if post_id != comment.post_id:
+                    errors.append((number, f'комментарий {comment.parent_id} '
+                                           f'к этой записи не найден'))
+                    continue
+                comment.path, comment.depth = path + comment.path, depth + 1
+            if comment.id is not None:
+                threads[comment.id] = (comment.post_id, comment.path,
+                                       comment.depth)
+            comments.append(comment)
+        with explicit_dates(Comment):
+            Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        if not all(comment.path for comment in comments):
+            Comment.objects.filter(path='').update(path=ROOT_PATH)
+        self.counts['comment'] += len(comments)
+        return errors
+
+    def follows(self, records, users):
+        Follow.objects.bulk_create(
+            (Follow(user_id=users[record['user']],
+                    author_id=users[record['author']])
+             for _, record in records),
+            ignore_conflicts=True)
+        self.counts['follow'] += len(records)
+
+    def reset_sequences(self):
+        """Move id sequences past the ids that came with the records."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
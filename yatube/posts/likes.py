@@ -0,0 +1,93 @@
+"""Likes with sharded counters.
+
+``Like`` holds one row per user and post, so a user likes a post once.
+The count is not bumped on ``Post`` itself: a burst of likes on one hot
+post would queue up on that row's lock. Each like adds to one of
+``settings.LIKE_SHARDS`` ``LikeShard`` rows picked at random instead, and
+``flush`` (``manage.py flush_likes``) periodically folds the shards into
+``Post.likes_count``, which the feeds show without extra queries. The post
+page adds the pending shards to the count and stays exact.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import cache, stats
+from .models import Like, LikeShard, Post
+
+BATCH_SIZE = 500
+
+
+def add_to_shard(post_id, delta):
+    shard = random.randrange(settings.LIKE_SHARDS)
+    shards = LikeShard.objects.filter(post_id=post_id, shard=shard)
+    if not shards.update(count=F('count') + delta):
+        # a concurrent writer may create the same shard
+        LikeShard.objects.bulk_create(
+            [LikeShard(post_id=post_id, shard=shard)], ignore_conflicts=True)
+        shards.update(count=F('count') + delta)
+
+
+def like(user, post_id):
+    """Like the post, return False if ``user`` already did."""
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, post_id=post_id)
+    except IntegrityError:
+        return False
+    add_to_shard(post_id, 1)
+    cache.bump([f'post:{post_id}'])
+    return True
+
+
+def unlike(user, post_id):
+    if not Like.objects.filter(user=user, post_id=post_id).delete()[0]:
+        return False
+    add_to_shard(post_id, -1)
+    cache.bump([f'post:{post_id}'])
+    return True
+
+
+def pending():
+    """Likes of the outer post still in its shards."""
+    total = (LikeShard.objects.filter(post=OuterRef('pk')).order_by()
+             .values('post').annotate(total=Sum('count')).values('total'))
+    return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+
+def flush():
+    """Fold the shards into ``Post.likes_count``, return posts updated."""
+    updated = 0
+    while True:
+        with transaction.atomic():
+            shards = list(LikeShard.objects.select_for_update()
+                          .order_by('pk')[:BATCH_SIZE])
+            if not shards:
+                return updated
+            deltas = {}
+            for shard in shards:
+                deltas[shard.post_id] = (deltas.get(shard.post_id, 0)
+                                         + shard.count)
+            for post_id, delta in deltas.items():
+                if delta:
+                    stats.change(Post.objects.filter(pk=post_id),
+                                 likes_count=delta)
+            LikeShard.objects.filter(
+                pk__in=[shard.pk for shard in shards]).delete()
+            bump_feeds(deltas)
+        updated += len(deltas)
+
+
+def bump_feeds(post_ids):
+    """The feed pages of the posts now show other counts."""
+    scopes = {'index'}
+    posts = (Post.objects.filter(pk__in=post_ids)
+             .values_list('pk', 'author__username', 'group__slug'))
+    for pk, username, slug in posts:
+        scopes.update([f'post:{pk}', f'profile:{username}'])
+        if slug:
+            scopes.add(f'group:{slug}')
+    cache.bump(sorted(scopes))
@@ -0,0 +1,143 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.paginator import CursorPaginator
+from posts import trending
+from posts.importer import explicit_dates
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = ('Замеряет стоимость популярного при росте числа записей: '
+            'комментарий, первая страница и пересчёт, а для сравнения — '
+            'ранжирование всех записей в каждом запросе. Данные создаются '
+            'в транзакции и откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[1000, 10000, 100000],
+                            help='Общее число записей для замеров')
+        parser.add_argument('--active', type=int, default=500,
+                            help='Записей с активностью в окне')
+        parser.add_argument('--events', type=int, default=5000,
+                            help='Комментариев к активным записям')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        if sizes[0] < options['active']:
+            raise CommandError('Записей должно быть не меньше активных')
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        with transaction.atomic():
+            self.author = User.objects.create_user(
+                f'trending-benchmark-{self.random.getrandbits(32)}')
+            self.active = self.create_active(options['active'],
+                                             options['events'])
+            rows, created = [], options['active']
+            for size in sizes:
+                self.create_old(size - created)
+                created = size
+                rows.append(self.measure(size, options['repeat']))
+            transaction.set_rollback(True)
+        self.print_table(rows)
+
+    def create_posts(self, count, newest, span):
+        def make_post():
+            date = self.now - newest - span * self.random.random()
+            return Post(text='Запись', author=self.author, pub_date=date,
+                        updated=date)
+
+        with explicit_dates(Post):
+            Post.objects.bulk_create((make_post() for _ in range(count)),
+                                     batch_size=BATCH_SIZE)
+
+    def create_active(self, count, events):
+        window = timedelta(seconds=settings.TRENDING_WINDOW)
+        self.create_posts(count, timedelta(), window)
+        active = list(Post.objects.filter(author=self.author)
+                      .values_list('pk', flat=True))
+
+        def make_comment():
+            date = self.now - window * self.random.random()
+            return Comment(post_id=self.random.choice(active),
+                           author=self.author, text='Комментарий',
+                           created=date)
+
+        with explicit_dates(Comment):
+            Comment.objects.bulk_create(
+                (make_comment() for _ in range(events)),
+                batch_size=BATCH_SIZE)
+        trending.refresh(self.now)
+        return active
+
+    def create_old(self, count):
+        # outside the window, they only add to the table sizes
+        window = timedelta(seconds=settings.TRENDING_WINDOW)
+        self.create_posts(count, window * 2, timedelta(days=365))
+
+    def comment(self):
+        # the path of a reader's comment, with its signals
+        with transaction.atomic():
+            Comment.objects.create(post_id=self.random.choice(self.active),
+                                   author=self.author, text='Комментарий')
+
+    def measure(self, size, repeat):
+        paginator = CursorPaginator(
+            trending.feed().select_related('author', 'group'),
+            settings.POSTSNUM, trending.ORDERING)
+        since = self.now - timedelta(seconds=settings.TRENDING_WINDOW)
+        naive = (Post.objects.select_related('author', 'group')
+                 .annotate(activity=Count(
+                     'comments', filter=Q(comments__created__gte=since)))
+                 .order_by('-activity', '-pub_date'))
+        few = max(2, repeat // 5)
+        return {
+            'size': size,
+            'event': median_ms(self.comment, repeat),
+            'page': median_ms(lambda: list(paginator.page_queryset()),
+                              repeat),
+            'refresh': median_ms(lambda: trending.refresh(self.now), few),
+            'naive': median_ms(lambda: list(naive[:settings.POSTSNUM]),
+                               few),
+        }
+
+    def print_table(self, rows):
+        columns = (('event', 'событие'), ('page', 'страница'),
+                   ('refresh', 'пересчёт'), ('naive', 'наивно'))
+        self.stdout.write(f'{"записей":>10}' + ''.join(
+            f'{title + ", мс":>16}' for _, title in columns))
+        for row in rows:
+            self.stdout.write(f'{row["size"]:>10}' + ''.join(
+                f'{row[key]:>16.3f}' for key, _ in columns))
+        first, last = rows[0], rows[-1]
+        if last['size'] == first['size']:
+            return
+        growth = ', '.join(
+            f'{title} ×{last[key] / max(first[key], 1e-6):.1f}'
+            for key, title in columns)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей ×{last["size"] / first["size"]:.0f}: {growth}'))
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.paginator import CursorPaginator
+from posts import timeline, trending
+from posts.models import Follow, Group, Post, User
+
+# plan lines that mean the whole table is read, or the whole result is
+# sorted before the page is cut from it
+FULL_SCANS = {
+    'sqlite': ('SCAN TABLE', 'SCAN ', 'USE TEMP B-TREE'),
+    'postgresql': ('Seq Scan', 'Sort Key:'),
+    'mysql': ('type: ALL', 'Using filesort'),
+}
+SORTS = ('USE TEMP B-TREE', 'Sort Key:', 'Using filesort')
+INDEX_MARKERS = ('USING INDEX', 'USING COVERING INDEX',
+                 'USING INTEGER PRIMARY KEY')
+
+
+class Command(BaseCommand):
+    help = ('Печатает SQL и план выполнения запросов ленты для index, '
+            'trending, group_posts, profile, follow_index и post_detail')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Завершиться с ошибкой при полном '
+                                 'сканировании таблицы')
+
+    def feeds(self):
+        post = Post.objects.order_by('-comments_count').first()
+        group = Group.objects.first()
+        reader = (User.objects.filter(pk__in=Follow.objects.values('user'))
+                  .first())
+        if post is None or group is None or reader is None:
+            raise CommandError('Для анализа нужны записи, группы и подписки')
+
+        feed = ('-pub_date', '-id')
+        yield 'posts:index', Post.objects.select_related(
+            'author', 'group'), feed
+        yield 'posts:trending', trending.feed().select_related(
+            'author', 'group'), trending.ORDERING
+        yield 'posts:posts_in_group', Post.objects.filter(
+            group__slug=group.slug).select_related('author', 'group'), feed
+        yield 'posts:profile', post.author.posts.select_related(
+            'author', 'group'), feed
+        posts = Post.objects.select_related('author', 'group')
+        yield 'posts:follow_index', timeline.timeline_posts(
+            posts, reader), timeline.TIMELINE_ORDERING
+        yield 'posts:follow_index', timeline.unfanned_posts(
+            posts, Follow.objects.filter(user=reader)
+            .values_list('author', flat=True).first()), timeline.POST_ORDERING
+        yield 'posts:post_detail', post.comments.filter(
+            depth__lt=settings.COMMENT_COLLAPSE_DEPTH).select_related(
+            'author'), ('path',)
+
+    def pages(self, queryset, ordering):
+        paginator = CursorPaginator(queryset, settings.POSTSNUM, ordering)
+        yield 'первая страница', paginator.page_queryset()
+        rows = paginator.fetch(None, forward=True)
+        if rows:
+            cursor = paginator.decode(paginator.encode(rows[-1]))
+            yield 'страница по курсору', paginator.page_queryset(cursor)
+
+    def is_full_scan(self, line):
+        markers = FULL_SCANS.get(connection.vendor, ())
+        if any(marker in line for marker in SORTS):
+            return True
+        return (any(marker in line for marker in markers)
+                and not any(marker in line for marker in INDEX_MARKERS))
+
+    def handle(self, *args, **options):
+        scans = []
+        for view_name, queryset, ordering in self.feeds():
+            for label, page in self.pages(queryset, ordering):
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{view_name}: {label}'))
+                self.stdout.write(str(page.query))
+                for line in page.explain().splitlines():
+                    if self.is_full_scan(line):
+                        scans.append(f'{view_name}: {line.strip()}')
+                        line = self.style.WARNING(line)
+                    self.stdout.write(f'  {line}')
+                self.stdout.write('')
+
+        if not scans:
+            self.stdout.write(self.style.SUCCESS(
+                'Полных сканирований таблиц не найдено'))
+            return
+        for scan in scans:
+            self.stdout.write(self.style.WARNING(
+                f'Полное сканирование: {scan}'))
+        if options['fail_on_scan']:
+            raise CommandError(
+                f'Найдено полных сканирований: {len(scans)}')
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from posts.export import FORMATS, TABLES, Export
+
+
+class Command(BaseCommand):
+    help = ('Выгружает записи, комментарии, группы или подписки в NDJSON '
+            'или CSV потоком, без загрузки таблицы в память')
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=TABLES)
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--after-id', type=int,
+                            help='Выгрузить только строки с id больше '
+                                 'указанного (водяной знак прошлой выгрузки)')
+        parser.add_argument('--since', type=parse_datetime,
+                            help='Записи и комментарии не старше даты '
+                                 '(ISO 8601)')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжимать на лету')
+
+    def handle(self, *args, **options):
+        export = Export(options['table'], options['format'],
+                        since=options['since'], after_id=options['after_id'],
+                        compress=options['gzip'])
+        if options['output'] == '-':
+            output = sys.stdout.buffer
+            self.write(export, output)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(export, output)
+        self.stderr.write(f'Последний id: {export.watermark}')
+
+    def write(self, export, output):
+        for chunk in export:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import likes
+
+
+class Command(BaseCommand):
+    help = ('Переносит новые отметки «нравится» из шардов в счётчики '
+            'записей. Запускайте раз в минуту, например из cron')
+
+    def handle(self, *args, **options):
+        updated = likes.flush()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено записей: {updated}'))
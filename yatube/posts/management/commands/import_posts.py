@@ -0,0 +1,138 @@
+import json
+import os
+import time
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from posts import search, stats, timeline, trending
+from posts.importer import Importer, validate
+
+
+class Command(BaseCommand):
+    help = ('Импортирует записи, комментарии и подписки из NDJSON с '
+            'картинками из каталога. Строки проверяются на всех ядрах, '
+            'после сбоя импорт продолжается с контрольной точки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл NDJSON')
+        parser.add_argument('--images', default='.',
+                            help='Каталог, от которого отсчитываются пути '
+                                 'картинок')
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов, 0 — без пула, в текущем процессе')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Строк на одну транзакцию')
+        parser.add_argument('--checkpoint',
+                            help='Файл контрольной точки, по умолчанию '
+                                 '<input>.checkpoint')
+
+    def handle(self, *args, **options):
+        self.checkpoint = (options['checkpoint']
+                           or f'{options["input"]}.checkpoint')
+        done = self.load_checkpoint()
+        if done:
+            self.stdout.write(f'Продолжаю со строки {done + 1}')
+        importer = Importer()
+        pool = None
+        if options['processes']:
+            # children must not share the parent's database connections
+            connections.close_all()
+            pool = Pool(options['processes'])
+        started = time.monotonic()
+        try:
+            with open(options['input'], encoding='utf-8') as source:
+                lines = self.run(pool, importer, source, done, options)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        self.stdout.write('Пересчитываю счётчики, ленты, поиск и популярное')
+        with transaction.atomic():
+            importer.reset_sequences()
+            stats.recount()
+            timeline.rebuild()
+            search.rebuild()
+            trending.refresh()
+        cache.clear()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {lines}, записей {importer.counts["post"]}, '
+            f'комментариев {importer.counts["comment"]}, '
+            f'подписок {importer.counts["follow"]}, ошибок {self.errors} '
+            f'за {elapsed:.1f} с ({lines / max(elapsed, 1e-6):.0f} строк/с)'))
+
+    def windows(self, source, done, size, image_dir):
+        """Batches of ``(number, line, image_dir)`` after the checkpoint."""
+        numbered = enumerate(source, start=1)
+        for _ in islice(numbered, done):
+            pass
+        while True:
+            window = list(islice(numbered, size))
+            if not window:
+                return
+            yield window[-1][0], [(number, line, image_dir)
+                                  for number, line in window if line.strip()]
+
+    def run(self, pool, importer, source, done, options):
+        """Validate the next batch in the pool while writing this one."""
+        self.errors = lines = 0
+        pending = None
+        started = time.monotonic()
+        for last, tasks in self.windows(source, done, options['batch_size'],
+                                        options['images']):
+            if pool is None:
+                fetch = partial(list, map(validate, tasks))
+            else:
+                fetch = pool.map_async(
+                    validate, tasks,
+                    chunksize=max(1, len(tasks) // (options['processes'] * 4))
+                ).get
+            if pending is not None:
+                lines += self.write(importer, *pending, started)
+            pending = last, tasks, fetch
+        if pending is not None:
+            lines += self.write(importer, *pending, started)
+        return lines
+
+    def write(self, importer, last, tasks, fetch, started):
+        records, errors = [], []
+        for number, record, error in fetch():
+            if error:
+                errors.append((number, error))
+            else:
+                records.append((number, record))
+        errors.extend(importer.write(records))
+        self.save_checkpoint(last)
+        for number, error in sorted(errors):
+            self.stderr.write(f'Строка {number}: {error}')
+        self.errors += len(errors)
+        elapsed = time.monotonic() - started
+        total = sum(importer.counts.values())
+        self.stdout.write(f'Строка {last}: {total} объектов, '
+                          f'{total / max(elapsed, 1e-6):.0f} в секунду')
+        return len(tasks)
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as checkpoint:
+                return json.load(checkpoint)['line']
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError):
+            raise CommandError(
+                f'Контрольная точка {self.checkpoint} повреждена')
+
+    def save_checkpoint(self, line):
+        # a crash must leave either the old or the new checkpoint
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump({'line': line}, checkpoint)
+        os.replace(temporary, self.checkpoint)
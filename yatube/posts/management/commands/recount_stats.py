@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+
+LABELS = {
+    'stats': 'Пользователи без счётчиков',
+    'posts_count': 'Записи авторов',
+    'followers_count': 'Подписчики',
+    'following_count': 'Подписки',
+    'comments_count': 'Комментарии к записям',
+    'replies_count': 'Ответы на комментарии',
+    'likes_count': 'Отметки «нравится»',
+}
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики записей, комментариев, подписок и '
+            'отметок «нравится» и сообщает о расхождениях')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = stats.recount(commit=not options['dry_run'])
+        for counter, rows in drift.items():
+            self.stdout.write(f'{LABELS[counter]}: расхождений {rows}')
+        if not any(drift.values()):
+            self.stdout.write(self.style.SUCCESS('Счётчики в порядке'))
+        elif not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг популярных записей по активности за '
+            'окно TRENDING_WINDOW и убирает угасшие. Запускайте раз в '
+            'несколько минут, например из cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fold', action='store_true',
+            help='Только добавить к рейтингу новые комментарии и отметки '
+                 'из шардов; запускайте раз в минуту')
+
+    def handle(self, *args, **options):
+        if options['fold']:
+            updated = trending.fold()
+            self.stdout.write(self.style.SUCCESS(
+                f'Обновлено записей: {updated}'))
+            return
+        kept, dropped = trending.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'В популярном записей: {kept}, убрано {dropped}'))
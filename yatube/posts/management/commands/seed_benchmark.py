@@ -0,0 +1,176 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts import search, stats, timeline, trending
+from posts.importer import explicit_dates
+from posts.models import (ROOT_PATH, Comment, Follow, Group, Post,
+                          ThumbnailJob)
+
+User = get_user_model()
+
+WORDS = ('книга', 'город', 'утро', 'дорога', 'море', 'работа', 'друзья',
+         'музыка', 'погода', 'кофе', 'поезд', 'осень', 'проект', 'кот',
+         'вечер', 'лес', 'письмо', 'праздник', 'фильм', 'идея')
+
+
+def zipf_weights(size, exponent):
+    """Cumulative weights for ``random.choices``, rank 1 is the heaviest."""
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(size)))
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, подписками, '
+            'записями и комментариями для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель степенного закона популярности')
+        parser.add_argument('--images', type=float, default=0.3,
+                            help='Доля записей с картинкой')
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            self.create_follows(users, options['follows'],
+                                options['exponent'])
+            posts = self.create_posts(users, groups, options)
+            self.create_comments(users, posts, options['comments'],
+                                 options['exponent'])
+            stats.recount()
+            timeline.rebuild()
+            search.rebuild()
+            trending.refresh()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'записей {len(posts)}, подписок {self.follows}, '
+            f'комментариев {options["comments"]}'))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password('benchmark')
+        self.bulk_create(User, (
+            User(username=f'bench{start + num}', password=password)
+            for num in range(count)))
+        return list(User.objects.filter(username__startswith='bench')
+                    .order_by('-pk').values_list('pk', flat=True)[:count])
+
+    def create_groups(self, count):
+        start = Group.objects.count()
+        self.bulk_create(Group, (
+            Group(title=f'Группа {start + num}', slug=f'bench-{start + num}',
+                  description=f'Описание группы {start + num}')
+            for num in range(count)))
+        return list(Group.objects.order_by('-pk')
+                    .values_list('pk', flat=True)[:count])
+
+    def create_follows(self, users, average, exponent):
+        """Out-degrees are exponential, author popularity follows Zipf."""
+        authors = self.random.sample(users, len(users))
+        weights = zipf_weights(len(authors), exponent)
+        follows = []
+        for user in users:
+            wanted = min(len(users) - 1,
+                         round(self.random.expovariate(1 / average)))
+            chosen = set()
+            while len(chosen) < wanted:
+                chosen.update(self.random.choices(
+                    authors, cum_weights=weights, k=wanted - len(chosen)))
+                chosen.discard(user)
+            follows.extend(Follow(user_id=user, author_id=author)
+                           for author in chosen)
+        self.bulk_create(Follow, follows)
+        self.follows = len(follows)
+
+    def create_images(self, count=10):
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for num in range(count):
+            content = BytesIO()
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            Image.new('RGB', (1280, 720), color).save(content, 'JPEG')
+            names.append(storage.save(
+                f'posts/bench_{num}.jpg', ContentFile(content.getvalue())))
+        ThumbnailJob.objects.bulk_create(
+            (ThumbnailJob(image=name) for name in names),
+            ignore_conflicts=True)
+        return names
+
+    def create_posts(self, users, groups, options):
+        authors = self.random.sample(users, len(users))
+        weights = zipf_weights(len(authors), options['exponent'])
+        images = self.create_images() if options['images'] else ['']
+        seconds = options['days'] * 24 * 60 * 60
+
+        def make_post(num):
+            pub_date = self.now - timedelta(
+                seconds=self.random.randrange(seconds))
+            has_image = self.random.random() < options['images']
+            return Post(
+                text=' '.join(self.random.choices(WORDS, k=12)),
+                author_id=self.random.choices(authors,
+                                              cum_weights=weights)[0],
+                group_id=(self.random.choice(groups)
+                          if groups and self.random.random() < 0.8
+                          else None),
+                image=self.random.choice(images) if has_image else '',
+                pub_date=pub_date,
+                updated=pub_date,
+            )
+
+        with explicit_dates(Post):
+            self.bulk_create(Post, (make_post(num)
+                                    for num in range(options['posts'])))
+        return list(Post.objects.order_by('-pk')
+                    .values_list('pk', 'pub_date')[:options['posts']])
+
+    def create_comments(self, users, posts, count, exponent):
+        if not posts:
+            return
+        popular = self.random.sample(posts, len(posts))
+        weights = zipf_weights(len(popular), exponent)
+
+        def make_comment(num):
+            post_id, pub_date = self.random.choices(
+                popular, cum_weights=weights)[0]
+            age = max(1, int((self.now - pub_date).total_seconds()))
+            return Comment(
+                post_id=post_id,
+                author_id=self.random.choice(users),
+                text=' '.join(self.random.choices(WORDS, k=6)),
+                created=pub_date + timedelta(
+                    seconds=self.random.randrange(age)),
+            )
+
+        with explicit_dates(Comment):
+            self.bulk_create(Comment, (make_comment(num)
+                                       for num in range(count)))
+        Comment.objects.filter(path='').update(path=ROOT_PATH)
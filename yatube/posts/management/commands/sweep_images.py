@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import storage
+
+
+class Command(BaseCommand):
+    help = ('Удаляет освобождённые картинки, на которые не ссылается ни одна '
+            'запись, и их миниатюры. Запускайте раз в час, например из cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать картинки, загруженные заново за столько секунд; '
+                 'по умолчанию IMAGE_RELEASE_GRACE')
+
+    def handle(self, *args, **options):
+        deleted = storage.sweep(options['grace'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено картинок: {deleted}'))
@@ -0,0 +1,87 @@
+import os
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob
+
+
+def render(image):
+    """Worker entry point: render every variant, report the failures."""
+    return image, thumbnails.generate(image)
+
+
+class Command(BaseCommand):
+    help = ('Генерирует миниатюры картинок из очереди на всех ядрах; '
+            'с --watch работает как фоновый обработчик')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Поставить в очередь все картинки без готовых миниатюр')
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов, 0 — без пула, в текущем процессе')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться, а ждать новых картинок в очереди')
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Пауза между проверками очереди в секундах')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            self.enqueue_missing()
+        processes = options['processes']
+        # children must not share the parent's database connections
+        connections.close_all()
+        pool = Pool(processes) if processes else None
+        try:
+            self.run(pool, options)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def enqueue_missing(self):
+        images = (Post.objects.exclude(image='').order_by()
+                  .values_list('image', flat=True).distinct())
+        queued = 0
+        for image in images.iterator():
+            if thumbnails.missing_variants(image):
+                thumbnails.enqueue(image)
+                queued += 1
+        self.stdout.write(f'В очередь добавлено картинок: {queued}')
+
+    def run(self, pool, options):
+        done = failed = 0
+        started = time.monotonic()
+        while True:
+            jobs = list(ThumbnailJob.objects
+                        .filter(attempts__lt=settings.THUMBNAIL_MAX_ATTEMPTS)
+                        .values_list('image', flat=True)
+                        [:options['batch_size']])
+            if not jobs:
+                if not options['watch']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            results = (pool.imap_unordered(render, jobs) if pool
+                       else map(render, jobs))
+            ready, broken = [], []
+            for image, failures in results:
+                (broken if failures else ready).append(image)
+            ThumbnailJob.objects.filter(image__in=ready).delete()
+            ThumbnailJob.objects.filter(image__in=broken).update(
+                attempts=F('attempts') + 1)
+            done += len(ready)
+            failed += len(broken)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Готово картинок: {done}, с ошибками: {failed}, '
+            f'за {elapsed:.1f} с')
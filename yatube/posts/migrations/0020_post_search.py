@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-17 22:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+from posts.stemmer import stems
+
+GIN_INDEX = ('CREATE INDEX post_text_search_idx ON posts_post '
+             "USING GIN (to_tsvector('russian'::regconfig, "
+             "COALESCE(\"text\", '')))")
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(GIN_INDEX)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_search USING fts5(body)')
+        Post = apps.get_model('posts', 'Post')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_search (rowid, body) '
+                'VALUES (%s, %s)',
+                [(pk, ' '.join(stems(text)))
+                 for pk, text in Post.objects.values_list('pk', 'text')])
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX post_text_search_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.Post')),
+                ('body', posts.models.SearchField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-17 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_unfanned(apps, schema_editor):
+    # posts of authors over the limit were merged into feeds at read time
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    hot = UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).values('user')
+    Post.objects.filter(author__in=hot).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'fanned_out', 'pub_date', 'id'], name='post_author_fanned_out_idx'),
+        ),
+        migrations.RunPython(mark_unfanned, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 00:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0029_timeline_entry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер')),
+                ('score', models.FloatField(verbose_name='Прирост рейтинга')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_shards', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='trendingshard',
+            constraint=models.UniqueConstraint(fields=('post', 'shard'), name='unique_trending_shard'),
+        ),
+    ]
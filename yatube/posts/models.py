@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Cast, LPad
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -9,6 +13,12 @@ class Group(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField()
 
+    class Meta:
+        indexes = [
+            # prefix ranges of the group autocomplete
+            models.Index(fields=['title'], name='group_title_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -18,6 +28,8 @@ class Post(models.Model):
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True)
+    updated = models.DateTimeField(verbose_name='Дата изменения',
+                                   auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,15 +44,52 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Выберите группу')
     image = models.ImageField('Картинка', upload_to='posts/',
+                              storage=ContentAddressedStorage(),
                               blank=True)
+    # rendered variants of the image, see posts.thumbnails
+    image_variants = models.TextField(blank=True, default='',
+                                      editable=False)
+    comments_count = models.PositiveIntegerField('Комментарии',
+                                                 default=0,
+                                                 editable=False)
+    # likes folded in from LikeShard, see posts.likes
+    likes_count = models.PositiveIntegerField('Отметки «нравится»',
+                                              default=0,
+                                              editable=False)
+    # pushed into the timelines of followers, see posts.timeline
+    fanned_out = models.BooleanField(default=True, editable=False)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date', 'id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['author', 'fanned_out', 'pub_date', 'id'],
+                         name='post_author_fanned_out_idx'),
+            models.Index(fields=['group', 'pub_date', 'id'],
+                         name='post_group_pub_date_idx'),
+            # reference count of shared image blobs
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+# digits of every id in a comment path
+PATH_STEP = 10
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+# path of a top-level comment bulk-created without one
+ROOT_PATH = LPad(Cast('id', models.CharField()), PATH_STEP, models.Value('0'))
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
@@ -58,6 +107,55 @@ class Comment(models.Model):
                             help_text='Введите текст комментария')
     created = models.DateTimeField(verbose_name='Дата добавления комментария',
                                    auto_now_add=True)
+    parent = models.ForeignKey('self',
+                               on_delete=models.CASCADE,
+                               blank=True,
+                               null=True,
+                               related_name='replies',
+                               verbose_name='Ответ на',
+                               )
+    # ids of the ancestors and of the comment itself, zero padded: a
+    # thread sorts depth first by path and a subtree is a range of it
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    replies_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+            # recent activity for posts.trending
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.parent is not None:
+            self.depth = self.parent.depth + 1
+        super().save(*args, **kwargs)
+        if not self.path:
+            # the path ends with the id, known only now
+            self.path = ((self.parent.path if self.parent else '')
+                         + path_segment(self.pk))
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def subtree(self):
+        """Replies at any depth, ``'9' < ':'`` closes the range."""
+        return Comment.objects.filter(post_id=self.post_id,
+                                      path__gt=self.path,
+                                      path__lt=self.path + ':')
+
+    @property
+    def can_reply(self):
+        return self.depth + 1 < settings.COMMENT_MAX_DEPTH
+
+    @property
+    def is_collapsed(self):
+        """Replies are left out of the page and loaded on demand."""
+        return (self.replies_count > 0
+                and self.depth + 1 == settings.COMMENT_COLLAPSE_DEPTH)
 
 
 class Follow(models.Model):
@@ -79,3 +177,187 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='likes',
+                             verbose_name='Пользователь',
+                             )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='likes',
+                             verbose_name='Пост',
+                             )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_like',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['post', 'user'],
+                         name='like_post_user_idx'),
+            models.Index(fields=['created'], name='like_created_idx'),
+        ]
+
+
+class LikeShard(models.Model):
+    """Likes of a post not yet in ``Post.likes_count``, spread over
+    ``settings.LIKE_SHARDS`` rows so that writers rarely wait on a lock."""
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='like_shards',
+                             verbose_name='Пост',
+                             )
+    shard = models.PositiveSmallIntegerField('Номер')
+    count = models.IntegerField('Прирост', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_like_shard',
+                fields=['post', 'shard'],
+            ),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Score of a post with recent activity, see posts.trending."""
+
+    post = models.OneToOneField(Post,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='trending',
+                                verbose_name='Пост',
+                                )
+    score = models.FloatField('Рейтинг')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['score', 'post'],
+                         name='trending_score_idx'),
+        ]
+
+
+class TrendingShard(models.Model):
+    """Comments and likes not yet in ``TrendingPost.score``, spread over
+    ``settings.TRENDING_SHARDS`` rows like ``LikeShard``."""
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='trending_shards',
+                             verbose_name='Пост',
+                             )
+    shard = models.PositiveSmallIntegerField('Номер')
+    score = models.FloatField('Прирост рейтинга')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_trending_shard',
+                fields=['post', 'shard'],
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='Пользователь',
+                                )
+    posts_count = models.PositiveIntegerField('Записи', default=0)
+    followers_count = models.PositiveIntegerField('Подписчики', default=0)
+    following_count = models.PositiveIntegerField('Подписки', default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline',
+                             verbose_name='Читатель',
+                             )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries',
+                             verbose_name='Пост',
+                             )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_timeline_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    created = models.DateTimeField('Дата постановки в очередь',
+                                   auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+
+    class Meta:
+        ordering = ['created']
+
+    def __str__(self):
+        return self.image
+
+
+class ReleasedImage(models.Model):
+    """Image blob no longer used by some post, see posts.storage.sweep."""
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    released = models.DateTimeField('Дата освобождения', auto_now_add=True)
+
+    def __str__(self):
+        return self.image
+
+
+class SearchField(models.TextField):
+    """Column of a full-text index, filtered with ``__match``."""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """Row of the FTS5 index of post texts, only exists on SQLite."""
+    post = models.OneToOneField(Post,
+                                on_delete=models.DO_NOTHING,
+                                primary_key=True,
+                                db_column='rowid',
+                                related_name='search_entry')
+    body = SearchField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_search'
@@ -0,0 +1,85 @@
+"""Full-text search over post texts.
+
+SQLite keeps Snowball stems of every post in the ``posts_post_search``
+FTS5 table, synced by signals. PostgreSQL stems with its own ``russian``
+dictionary and uses a GIN index over ``to_tsvector`` of the text, so it
+needs no syncing. Results carry a ``rank`` annotation, higher is better.
+"""
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.fields import FloatField
+
+from .models import Post
+from .stemmer import WORDS, stems
+
+CONFIG = 'russian'
+ORDERING = ('-rank', '-id')
+BATCH_SIZE = 500
+NO_RANK = Value(0, output_field=FloatField())
+INSERT = 'INSERT INTO posts_post_search (rowid, body) VALUES (%s, %s)'
+
+
+def match_query(text):
+    return ' '.join(f'"{word}"' for word in stems(text))
+
+
+def search(queryset, text):
+    if connection.vendor == 'sqlite':
+        query = match_query(text)
+        if not query:
+            return queryset.annotate(rank=NO_RANK).none()
+        return (queryset.filter(search_entry__body__match=query)
+                .annotate(rank=-F('search_entry__rank')))
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('text', config=CONFIG)
+        query = SearchQuery(text, config=CONFIG)
+        return (queryset.annotate(document=vector,
+                                  rank=SearchRank(vector, query))
+                .filter(document=query))
+    words = WORDS.findall(text)
+    if not words:
+        return queryset.annotate(rank=NO_RANK).none()
+    condition = Q()
+    for word in words:
+        condition &= Q(text__icontains=word)
+    return queryset.filter(condition).annotate(rank=NO_RANK)
+
+
+def index(post):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_search WHERE rowid = %s',
+                       [post.pk])
+        # execute(), the debug toolbar cannot log executemany() on SQLite
+        cursor.execute(INSERT, [post.pk, ' '.join(stems(post.text))])
+
+
+def remove(post_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_search WHERE rowid = %s',
+                       [post_id])
+
+
+def rebuild():
+    """Reindex every post, for bulk loads that bypass signals."""
+    if connection.vendor != 'sqlite':
+        return
+    rows = Post.objects.order_by().values_list('pk', 'text')
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_search')
+        batch = []
+        for pk, text in rows.iterator():
+            batch.append((pk, ' '.join(stems(text))))
+            if len(batch) == BATCH_SIZE:
+                insert(cursor, batch)
+                batch = []
+        insert(cursor, batch)
+
+
+def insert(cursor, rows):
+    cursor.executemany(INSERT, rows)
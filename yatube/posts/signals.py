@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (cache, search, stats, storage, thumbnails, timeline,
+               trending)
+from .models import Comment, Follow, Group, Like, Post, UserStats
+
+User = get_user_model()
+
+
+def group_scopes(*group_ids):
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]).values_list('slug', flat=True)
+    return [f'group:{slug}' for slug in slugs]
+
+
+# user fields the pages show
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_name(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields).intersection(
+            NAME_FIELDS):
+        # such as last_login on every login
+        return
+    instance._old_name = (User.objects.filter(pk=instance.pk)
+                          .values_list(*NAME_FIELDS).first())
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, raw=False, **kwargs):
+    old_name = getattr(instance, '_old_name', None)
+    if raw or created or old_name is None:
+        return
+    instance._old_name = None
+    if old_name == tuple(getattr(instance, field) for field in NAME_FIELDS):
+        return
+    posts = Post.objects.filter(author=instance)
+    commented = Comment.objects.filter(author=instance).values('post')
+    post_ids = (Post.objects.filter(Q(author=instance) | Q(pk__in=commented))
+                .values_list('pk', flat=True))
+    cache.bump(['index', 'trending', f'profile:{old_name[0]}',
+                f'profile:{instance.username}']
+               + group_scopes(*posts.values_list('group', flat=True)
+                              .distinct())
+               + [f'post:{pk}' for pk in post_ids])
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        old_group_id, old_image, variants = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image', 'image_variants').first()
+            or (None, None, ''))
+        instance._old_group_id, instance._old_image = old_group_id, old_image
+        # the worker may have filled them in since the post was loaded
+        instance.image_variants = (
+            variants if instance.image.name == old_image else '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    profile = [f'profile:{instance.author.username}']
+    old_image = getattr(instance, '_old_image', None)
+    if instance.image.name != old_image:
+        thumbnails.enqueue(instance.image.name)
+        storage.release(old_image)
+    search.index(instance)
+    if created:
+        stats.bump(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+        trending.record_post(instance)
+        cache.bump(['index'] + group_scopes(instance.group_id), cache.HEAD)
+        cache.bump(profile)
+    else:
+        old_group_id = getattr(instance, '_old_group_id', None)
+        cache.bump(['index', 'trending', f'post:{instance.pk}'] + profile
+                   + group_scopes(instance.group_id, old_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+    search.remove(instance.pk)
+    stats.bump(instance.author_id, posts_count=-1)
+    cache.bump(['index', 'trending', f'profile:{instance.author.username}']
+               + group_scopes(instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump_comments(instance.post_id, 1)
+        stats.bump_replies(instance.parent_id, 1)
+        trending.add_to_shard(instance.post_id,
+                              settings.TRENDING_WEIGHTS['comment'],
+                              instance.created)
+        cache.bump([f'post:{instance.post_id}'])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.bump_comments(instance.post_id, -1)
+    stats.bump_replies(instance.parent_id, -1)
+    cache.bump([f'post:{instance.post_id}'])
+
+
+@receiver(post_save, sender=Like)
+def like_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.add_to_shard(instance.post_id,
+                              settings.TRENDING_WEIGHTS['like'],
+                              instance.created)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.user_id and instance.author_id:
+        stats.bump(instance.author_id, followers_count=1)
+        stats.bump(instance.user_id, following_count=1)
+        timeline.backfill(instance.user, instance.author)
+        cache.bump([f'profile:{instance.author.username}',
+                    f'profile:{instance.user.username}'])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if instance.user_id and instance.author_id:
+        stats.bump(instance.author_id, followers_count=-1)
+        stats.bump(instance.user_id, following_count=-1)
+        timeline.prune(instance.user_id, instance.author_id)
+        cache.bump([f'profile:{instance.author.username}',
+                    f'profile:{instance.user.username}'])
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._old_scopes = group_scopes(instance.pk)
+        instance._old_link = (Group.objects.filter(pk=instance.pk)
+                              .values_list('slug', 'title').first())
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = (getattr(instance, '_old_scopes', [])
+              + [f'group:{instance.slug}', 'groups'])
+    old_link = getattr(instance, '_old_link', None)
+    if old_link and old_link != (instance.slug, instance.title):
+        # cards on other feeds link to the group
+        scopes += ['index', 'trending'] + author_scopes(instance)
+    cache.bump(scopes)
+
+
+def author_scopes(group):
+    authors = (User.objects.filter(posts__group=group).distinct()
+               .values_list('username', flat=True))
+    return [f'profile:{username}' for username in authors]
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.bump(['index', f'group:{instance.slug}', 'groups']
+               + author_scopes(instance))
@@ -0,0 +1,101 @@
+"""Denormalized counters.
+
+``UserStats`` keeps post, follower and following counts per user,
+``Post.comments_count`` the number of comments and
+``Comment.replies_count`` the number of direct replies. They are kept by the
+signal handlers in the same transaction as the change itself; ``recount``
+rebuilds them from scratch and reports the drift. ``Post.likes_count`` is
+kept by ``posts.likes``, ``recount`` rebuilds it as well.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Like, LikeShard, Post, UserStats
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def change(queryset, **deltas):
+    """Shift counters by ``deltas`` without reading them; never below zero."""
+    return queryset.update(**{
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def bump(user_id, **deltas):
+    if user_id is None:
+        return
+    stats = UserStats.objects.filter(user_id=user_id)
+    if not change(stats, **deltas) and all(d > 0 for d in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        change(stats, **deltas)
+
+
+def bump_comments(post_id, delta):
+    if post_id is not None:
+        change(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def bump_replies(comment_id, delta):
+    if comment_id is not None:
+        change(Comment.objects.filter(pk=comment_id), replies_count=delta)
+
+
+def actual_count(model, field, outer_field='pk'):
+    counts = (model.objects
+              .filter(**{field: OuterRef(outer_field)})
+              .order_by()
+              .values(field)
+              .annotate(total=Count('pk'))
+              .values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def stale_rows(queryset, field, actual):
+    stale = (queryset.annotate(actual=actual)
+             .exclude(**{field: F('actual')})
+             .values_list('pk', 'actual'))
+    return [queryset.model(pk=pk, **{field: value})
+            for pk, value in stale.iterator(chunk_size=BATCH_SIZE)]
+
+
+def recount(commit=True):
+    """Rebuild all counters in bulk, return ``{counter: drifted rows}``."""
+    drift = {}
+    missing = User.objects.filter(stats__isnull=True)
+    drift['stats'] = missing.count()
+    if commit and drift['stats']:
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=pk)
+             for pk in missing.values_list('pk', flat=True).iterator()),
+            batch_size=BATCH_SIZE)
+
+    targets = [(UserStats.objects.all(), field,
+                actual_count(model, related, 'user_id'))
+               for field, (model, related) in USER_COUNTERS.items()]
+    targets.append((Post.objects.all(), 'comments_count',
+                    actual_count(Comment, 'post')))
+    targets.append((Comment.objects.all(), 'replies_count',
+                    actual_count(Comment, 'parent')))
+    targets.append((Post.objects.all(), 'likes_count',
+                    actual_count(Like, 'post')))
+    if commit:
+        # the shards only hold likes missing from likes_count
+        LikeShard.objects.all().delete()
+    for queryset, field, actual in targets:
+        fixed = stale_rows(queryset, field, actual)
+        drift[field] = len(fixed)
+        if commit and fixed:
+            queryset.model.objects.bulk_update(fixed, [field],
+                                               batch_size=BATCH_SIZE)
+    return drift
@@ -0,0 +1,117 @@
+"""Snowball stemmer for Russian.
+
+A straight port of https://snowballstem.org/algorithms/russian/stemmer.html
+used to index post texts on databases without a Russian full-text
+dictionary of their own.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORDS = re.compile(r'\w+')
+
+
+def region(word, start=0):
+    """Start of the region after the first non-vowel following a vowel."""
+    for pos in range(start + 1, len(word)):
+        if word[pos] not in VOWELS and word[pos - 1] in VOWELS:
+            return pos + 1
+    return len(word)
+
+
+def strip(word, groups):
+    """Remove the longest ending of ``groups``, None if there is none.
+
+    Endings of the first group only count after 'а' or 'я', which stays.
+    """
+    found = max(((ending, number) for number, endings in enumerate(groups)
+                 for ending in endings if word.endswith(ending)),
+                key=lambda match: len(match[0]), default=None)
+    if found is None:
+        return None
+    ending, number = found
+    if number == 0 and not word[:-len(ending)].endswith(('а', 'я')):
+        return None
+    return word[:-len(ending)]
+
+
+def strip_adjectival(word):
+    stem = strip(word, ADJECTIVE)
+    if stem is None:
+        return None
+    participle = strip(stem, PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def step_1(rest):
+    result = strip(rest, PERFECTIVE_GERUND)
+    if result is not None:
+        return result
+    reflexive = strip(rest, REFLEXIVE)
+    rest = rest if reflexive is None else reflexive
+    for result in (strip_adjectival(rest), strip(rest, VERB),
+                   strip(rest, NOUN)):
+        if result is not None:
+            return result
+    return rest
+
+
+def step_4(rest):
+    if rest.endswith('нн'):
+        return rest[:-1]
+    for ending in SUPERLATIVE:
+        if rest.endswith(ending):
+            rest = rest[:-len(ending)]
+            return rest[:-1] if rest.endswith('нн') else rest
+    return rest[:-1] if rest.endswith('ь') else rest
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv = next((pos + 1 for pos, char in enumerate(word) if char in VOWELS),
+              len(word))
+    r2 = region(word, region(word))
+    prefix, rest = word[:rv], step_1(word[rv:])
+    if rest.endswith('и'):
+        rest = rest[:-1]
+    for ending in DERIVATIONAL:
+        if rest.endswith(ending) and len(prefix + rest) - len(ending) >= r2:
+            rest = rest[:-len(ending)]
+            break
+    return prefix + step_4(rest)
+
+
+def stems(text):
+    return [stem(word) for word in WORDS.findall(text)]
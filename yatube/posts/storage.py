@@ -0,0 +1,119 @@
+"""Content-addressed storage for post images.
+
+A file is saved as ``<upload_to>/ab/cd/abcd...<ext>`` where the name is the
+SHA-256 of its content, so the same picture uploaded twice is one blob
+with one set of image variants, and no directory grows past 65536 entries.
+Blobs are shared between posts, so a post that drops its image only
+``release``s the blob. ``sweep`` (``manage.py sweep_images``) deletes the
+released blobs no post refers to. An upload of the same content finds the
+blob on disk and touches it, and the post may commit only later: blobs
+touched within ``settings.IMAGE_RELEASE_GRACE`` seconds are kept.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_LEVELS = 2
+BLOB_NAME = re.compile(
+    r'^[^/]+/' + r'[0-9a-f]{2}/' * SHARD_LEVELS + r'[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_name(directory, digest, extension):
+    shards = [digest[2 * level:2 * level + 2]
+              for level in range(SHARD_LEVELS)]
+    return '/'.join([directory, *shards, digest + extension])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # the final name depends on the content, see _save()
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory, filename = os.path.split(name)
+        name = content_name(directory, digest.hexdigest(),
+                            os.path.splitext(filename)[1].lower())
+        path = self.path(name)
+        try:
+            # a sweep keeps blobs used since its grace period started
+            os.utime(path)
+            return name
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                for chunk in content.chunks():
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            # same name means same bytes, a concurrent upload may win
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+def release(name):
+    """Queue blob ``name`` for ``sweep``.
+
+    Files named before the storage was content-addressed are left alone.
+    """
+    if not name or not BLOB_NAME.match(name):
+        return
+    # models.py imports this module for the field storage
+    from .models import ReleasedImage
+    ReleasedImage.objects.bulk_create([ReleasedImage(image=name)],
+                                      ignore_conflicts=True)
+
+
+def sweep(grace=None):
+    """Delete released blobs and their variants nothing uses any more,
+    return how many were deleted."""
+    from . import thumbnails
+    from .models import Post, ReleasedImage, ThumbnailJob
+
+    storage = Post._meta.get_field('image').storage
+    if grace is None:
+        grace = settings.IMAGE_RELEASE_GRACE
+    deleted = 0
+    for released in ReleasedImage.objects.order_by('pk').iterator():
+        name = released.image
+        if Post.objects.filter(image=name).exists():
+            released.delete()
+        elif discard(storage.path(name), time.time() - grace):
+            if not storage.exists(name):
+                thumbnails.delete(name)
+                ThumbnailJob.objects.filter(image=name).delete()
+            released.delete()
+            deleted += 1
+    return deleted
+
+
+def discard(path, cutoff):
+    """Delete the blob unless an upload touched it after ``cutoff``."""
+    trash = path + '.released'
+    try:
+        # uploads from now on write a new copy, see _save()
+        os.replace(path, trash)
+    except FileNotFoundError:
+        return True
+    if os.stat(trash).st_mtime > cutoff:
+        os.replace(trash, path)
+        return False
+    os.remove(trash)
+    return True
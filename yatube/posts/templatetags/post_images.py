@@ -0,0 +1,20 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_picture(context, post, variant):
+    """``<picture>`` data of the post image if it is ready, otherwise None.
+
+    Pages rendered with a missing variant are marked on the request, so
+    that they are not put into the page cache with a placeholder.
+    """
+    if not post.image:
+        return None
+    picture = thumbnails.picture(post, variant)
+    if picture is None and 'request' in context:
+        context['request'].pending_thumbnails = True
+    return picture
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        cls.groups = [Group.objects.create(title=f'Группа {num}',
+                                           slug=f'group-{num}')
+                      for num in range(5)]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = Post.objects.count()
+        for num in range(start, start + count):
+            author = User.objects.create_user(f'author{num}')
+            Post.objects.create(text=f'Текст №{num}', author=author,
+                                group=self.groups[num % len(self.groups)])
+            Follow.objects.create(user=self.admin, author=author)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_follow_changelist',
+                     'admin:posts_group_changelist'):
+            with self.subTest(name=name):
+                self.add_rows(2)
+                # the first request caches the session and the user
+                self.queries(reverse(name))
+                few = self.queries(reverse(name))
+                self.add_rows(10)
+                self.assertEqual(self.queries(reverse(name)), few)
+
+    def test_post_changelist_has_date_hierarchy(self):
+        self.add_rows(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'pub_date__year=')
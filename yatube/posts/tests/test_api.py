@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text=f'Текст №{num}', author=cls.author, group=cls.group)
+            for num in range(settings.POSTSNUM + 5))
+        cls.post = Post.objects.order_by('-pk').first()
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'api:{name}', args=args), params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+
+    def test_feeds_walk_with_cursor(self):
+        feeds = (
+            ('posts', ()),
+            ('group_posts', (self.group.slug,)),
+            ('profile_posts', (self.author.username,)),
+        )
+        for name, args in feeds:
+            with self.subTest(name=name):
+                first = self.get(name, *args).json()
+                second = self.get(name, *args, after=first['next']).json()
+                self.assertEqual(len(first['results']), settings.POSTSNUM)
+                self.assertEqual(len(second['results']), 5)
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0]['author'], 'author')
+
+    def test_sparse_fieldsets(self):
+        data = self.get('posts', fields='id,text').json()
+
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertEqual(self.get('posts', fields='id,password').status_code,
+                         400)
+
+    def test_batched_lookup_keeps_order(self):
+        ids = list(Post.objects.values_list('pk', flat=True)[:3])
+        ids.reverse()
+        data = self.get('posts', ids=','.join(map(str, ids)),
+                        fields='text').json()
+
+        self.assertEqual([item['text'] for item in data['results']],
+                         [Post.objects.get(pk=pk).text for pk in ids])
+        self.assertEqual(self.get('posts', ids='1,x').status_code, 400)
+
+    def test_feed_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.get('posts')
+
+    def test_post_and_comments(self):
+        post = self.get('post_detail', self.post.pk).json()
+        comments = self.get('post_comments', self.post.pk).json()
+
+        self.assertEqual(post['text'], self.post.text)
+        self.assertEqual(post['group'], 'group')
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        self.assertEqual(self.get('post_detail', 0).status_code, 404)
+        self.assertEqual(self.get('group_posts', 'nogroup').status_code, 404)
+
+    def test_follow_feed_needs_login(self):
+        self.assertEqual(self.get('follow_posts').status_code, 401)
+
+        self.client.force_login(self.reader)
+        data = self.get('follow_posts').json()
+        self.assertEqual(len(data['results']), settings.POSTSNUM)
+
+    def test_group_autocomplete(self):
+        Group.objects.create(title='Котики', slug='cats')
+        Group.objects.create(title='Кофе', slug='coffee')
+        cases = (
+            ('кот', ['cats']),
+            ('Ко', ['coffee', 'cats']),
+            ('co', ['coffee']),
+            ('собаки', []),
+        )
+        for query, slugs in cases:
+            with self.subTest(query=query):
+                response = self.get('group_autocomplete', q=query)
+                results = response.json()['results']
+                self.assertEqual(sorted(item['slug'] for item in results),
+                                 sorted(slugs))
+
+    def test_group_autocomplete_is_cached_until_groups_change(self):
+        self.get('group_autocomplete', q='Гр')
+        with self.assertNumQueries(0):
+            self.get('group_autocomplete', q='Гр')
+
+        Group.objects.create(title='Графика', slug='graphics')
+        response = self.get('group_autocomplete', q='Гр')
+        self.assertEqual(len(response.json()['results']), 2)
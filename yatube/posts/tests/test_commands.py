@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import models
+from django.test import TestCase, override_settings
+
+from .. import stats
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ExplainFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user('author')
+        reader = User.objects.create_user('reader')
+        group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=reader, author=author)
+        for num in range(30):
+            post = Post.objects.create(text=f'Текст №{num}',
+                                       author=author, group=group)
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+
+    def test_feeds_use_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', '--fail-on-scan', stdout=out)
+
+        output = out.getvalue()
+        for view_name in ('posts:index', 'posts:trending',
+                          'posts:posts_in_group', 'posts:profile',
+                          'posts:follow_index', 'posts:post_detail'):
+            with self.subTest(view_name=view_name):
+                self.assertIn(view_name, output)
+        self.assertIn('post_author_pub_date_idx', output)
+        self.assertIn('post_group_pub_date_idx', output)
+        self.assertIn('trending_score_idx', output)
+        self.assertIn('comment_post_path_idx', output)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedBenchmarkTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_creates_consistent_graph(self):
+        call_command('seed_benchmark', users=30, posts=100, comments=200,
+                     groups=3, follows=5, seed=1, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(Follow.objects.filter(
+            user=models.F('author')).exists())
+        self.assertFalse(any(stats.recount(commit=False).values()))
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user,
+                                         post__author=follow.author).count(),
+            follow.author.posts.count())
+
+
+class BenchmarkTrendingTests(TestCase):
+    def test_reports_every_size_and_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_trending', sizes=[20, 40], active=5,
+                     events=20, repeat=2, seed=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('наивно', output)
+        self.assertIn('Записей ×2', output)
+        self.assertFalse(Post.objects.exists())
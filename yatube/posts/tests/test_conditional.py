@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import likes
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(text='Текст', author=cls.user,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:posts_in_group', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_give_new_etags(self):
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        changes = (
+            (lambda: Post.objects.create(text='Новый', author=self.user,
+                                         group=self.group), self.urls),
+            (lambda: self.post.save(), self.urls),
+            (lambda: Comment.objects.create(post=self.post, author=self.user,
+                                            text='Комментарий'), (detail,)),
+        )
+        for change, urls in changes:
+            etags = [self.client.get(url)['ETag'] for url in urls]
+            change()
+            for url, etag in zip(urls, etags):
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_revalidates_by_etag_only(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='Комментарий')
+        etag = self.client.get(url)['ETag']
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        reader = User.objects.create_user('reader')
+        likes.like(reader, self.post.pk)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_control(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage', response['Cache-Control'])
+
+        authorized = Client()
+        authorized.force_login(self.user)
+        response = authorized.get(reverse('posts:index'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'],
+                            self.client.get(reverse('posts:index'))['ETag'])
+
+    def test_missing_post_is_not_found(self):
+        response = self.client.get(reverse('posts:post_detail', args=(0,)))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [Post.objects.create(text=f'Текст, "№{num}"',
+                                         author=cls.author, group=cls.group)
+                     for num in range(5)]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export')
+            stderr = StringIO()
+            call_command('export_yatube', *args, output=path,
+                         stderr=stderr, **options)
+            opener = gzip.open if options.get('gzip') else open
+            with opener(path, 'rt', encoding='utf-8') as output:
+                return output.read(), stderr.getvalue()
+
+    def test_ndjson_rows_with_watermark(self):
+        content, stderr = self.export('posts')
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertIn(f'Последний id: {self.posts[-1].pk}', stderr)
+
+    def test_incremental_export(self):
+        content, _ = self.export('posts', after_id=self.posts[2].pk)
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in self.posts[3:]])
+
+    def test_csv_and_gzip(self):
+        content, _ = self.export('follows', format='csv', gzip=True)
+
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows, [['id', 'user', 'author'],
+                                [str(Follow.objects.get().pk), 'reader',
+                                 'author']])
+
+    def test_view_streams_to_staff_only(self):
+        url = reverse('posts:export', args=('comments',))
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, {'gzip': ''})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(json.loads(rows)['text'], 'Комментарий')
+        self.assertEqual(
+            self.client.get(reverse('posts:export', args=('users',)))
+            .status_code, 404)
@@ -1,12 +1,19 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template.defaultfilters import filesizeformat
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Group, Post
 
@@ -111,7 +118,10 @@ class PostCreateFormTests(TestCase):
         # check that last post contains image from form_data
 
         default_upload_path = last_post._meta.get_field('image').upload_to
-        path_to_file = f"{default_upload_path}{uploaded.name}"
+        # files are named by the hash of their content
+        digest = hashlib.sha256(small_gif).hexdigest()
+        path_to_file = (f"{default_upload_path}"
+                        f"{digest[:2]}/{digest[2:4]}/{digest}.gif")
         self.assertEqual(last_post.image, path_to_file)
 
     def test_comment_creation_by_unknown_user(self):
@@ -137,3 +147,118 @@ class PostCreateFormTests(TestCase):
 
         self.assertEqual(response.context['comments'][0],
                          self.post.comments.last())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='photo.jpg'):
+        upload = BytesIO(content)
+        upload.name = name
+        return self.client.post(reverse('posts:post_create'),
+                                data={'text': 'С картинкой', 'image': upload})
+
+    def jpeg(self, size=(40, 20), orientation=None):
+        output = BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        Image.new('RGB', size, (200, 0, 0)).save(output, 'JPEG',
+                                                 exif=exif.tobytes())
+        return output.getvalue()
+
+    def test_exif_orientation_is_applied(self):
+        self.upload(self.jpeg(orientation=6))
+
+        post = Post.objects.get()
+        with post.image.open() as stored, Image.open(stored) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn(0x0112, image.getexif())
+
+    def test_upright_image_is_stored_as_is(self):
+        content = self.jpeg()
+        self.upload(content)
+
+        with Post.objects.get().image.open() as stored:
+            self.assertEqual(stored.read(), content)
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_oversized_file_is_rejected(self):
+        response = self.upload(b'\xff\xd8\xff' + b'0' * 4096)
+
+        self.assertFormError(response, 'form', 'image',
+                             f'Файл больше {filesizeformat(1024)}')
+        self.assertFalse(Post.objects.exists())
+
+    def test_unknown_format_is_rejected_before_pillow(self):
+        content = BytesIO()
+        Image.new('RGB', (10, 10)).save(content, 'BMP')
+        with mock.patch('PIL.Image.open') as image_open:
+            response = self.upload(content.getvalue(), 'photo.bmp')
+
+        image_open.assert_not_called()
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите картинку в формате JPEG, PNG, GIF или WebP')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_are_rejected_from_header(self):
+        with mock.patch('PIL.ImageFile.ImageFile.load') as load:
+            response = self.upload(self.jpeg(size=(20, 20)))
+
+        load.assert_not_called()
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое разрешение картинки')
+
+
+class GroupSelectTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+        cls.groups = [Group.objects.create(title=f'Группа {num}',
+                                           slug=f'group-{num}')
+                      for num in range(30)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_create_page_renders_no_groups(self):
+        response = self.client.get(reverse('posts:post_create'))
+
+        self.assertNotContains(response, 'Группа 1')
+        self.assertContains(
+            response, f'data-autocomplete-url="'
+                      f'{reverse("api:group_autocomplete")}"')
+
+    def test_edit_page_renders_chosen_group_only(self):
+        post = Post.objects.create(text='Текст', author=self.user,
+                                   group=self.groups[3])
+        response = self.client.get(reverse('posts:post_edit',
+                                           args=(post.pk,)))
+
+        self.assertContains(response, 'Группа 3')
+        self.assertNotContains(response, 'Группа 4')
+
+    def test_group_is_validated_with_one_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('posts:post_create'),
+                             {'text': 'Текст', 'group': self.groups[5].pk})
+
+        self.assertTrue(Post.objects.filter(group=self.groups[5]).exists())
+        # the cache signals read slugs only, a lookup loads the whole row
+        lookups = [query for query in queries.captured_queries
+                   if '"posts_group"."description"' in query['sql']]
+        self.assertEqual(len(lookups), 1)
@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, ThumbnailJob
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+RECORDS = [
+    {'type': 'post', 'id': 10, 'author': 'leo', 'group': 'cats',
+     'text': 'Первая запись', 'pub_date': '2021-11-06T15:13:00+00:00',
+     'image': 'one.gif'},
+    {'type': 'post', 'id': 11, 'author': 'leo', 'text': 'Вторая запись',
+     'image': 'copy/one.gif'},
+    {'type': 'comment', 'id': 5, 'post': 10, 'author': 'ann',
+     'text': 'Комментарий', 'created': '2021-11-07T10:00:00+00:00'},
+    {'type': 'follow', 'user': 'ann', 'author': 'leo'},
+]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        os.makedirs(os.path.join(self.directory, 'copy'))
+        for name in ('one.gif', 'copy/one.gif'):
+            with open(os.path.join(self.directory, name), 'wb') as image:
+                image.write(SMALL_GIF)
+        self.input = os.path.join(self.directory, 'posts.ndjson')
+
+    def run_import(self, lines, **options):
+        with open(self.input, 'w', encoding='utf-8') as source:
+            source.write('\n'.join(lines) + '\n')
+        stderr = StringIO()
+        call_command('import_posts', self.input, images=self.directory,
+                     processes=0, batch_size=2, stdout=StringIO(),
+                     stderr=stderr, **options)
+        return stderr.getvalue()
+
+    def test_imports_records(self):
+        self.run_import([json.dumps(record) for record in RECORDS])
+
+        post = Post.objects.get(pk=10)
+        self.assertEqual(post.author.username, 'leo')
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.pub_date.year, 2021)
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(Comment.objects.filter(
+            pk=5, post=post, author__username='ann').exists())
+        self.assertTrue(Follow.objects.filter(
+            user__username='ann', author__username='leo').exists())
+        self.assertFalse(
+            User.objects.get(username='ann').has_usable_password())
+        self.assertFalse(os.path.exists(f'{self.input}.checkpoint'))
+
+    def test_images_are_stored_once_and_queued(self):
+        self.run_import([json.dumps(record) for record in RECORDS[:2]])
+
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(name.startswith('posts/'))
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
+        self.assertTrue(ThumbnailJob.objects.filter(image=name).exists())
+
+    def test_invalid_lines_are_reported(self):
+        errors = self.run_import([
+            'не json',
+            json.dumps({'type': 'post', 'author': 'leo'}),
+            json.dumps({'type': 'comment', 'post': 99, 'author': 'ann',
+                        'text': 'Комментарий'}),
+            json.dumps({'type': 'post', 'author': 'leo', 'text': 'Текст',
+                        'image': 'missing.gif'}),
+            json.dumps({'type': 'post', 'author': 'leo', 'text': 'Текст'}),
+        ])
+
+        for number in range(1, 5):
+            with self.subTest(number=number):
+                self.assertIn(f'Строка {number}:', errors)
+        self.assertNotIn('Строка 5:', errors)
+        self.assertEqual(Post.objects.count(), 1)
+
+    @override_settings(IMAGE_MAX_PIXELS=1)
+    def test_oversized_images_are_reported(self):
+        errors = self.run_import([json.dumps(
+            {'type': 'post', 'author': 'leo', 'text': 'Текст',
+             'image': 'one.gif'})])
+
+        self.assertIn('Строка 1:', errors)
+        self.assertIn('слишком большое разрешение', errors)
+        self.assertFalse(Post.objects.exists())
+
+    def test_resumes_from_checkpoint(self):
+        with open(f'{self.input}.checkpoint', 'w') as checkpoint:
+            json.dump({'line': 2}, checkpoint)
+
+        self.run_import([json.dumps(record) for record in RECORDS])
+
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+
+    def test_exported_threads_are_imported(self):
+        author = User.objects.create_user('leo')
+        post = Post.objects.create(text='Запись', author=author)
+        root = Comment.objects.create(post=post, author=author, text='Корень')
+        reply = Comment.objects.create(post=post, author=author,
+                                       parent=root, text='Ответ')
+        Comment.objects.create(post=post, author=author, parent=reply,
+                               text='Ответ на ответ')
+        columns = ('pk', 'parent_id', 'path', 'depth')
+        threads = list(Comment.objects.order_by('pk').values_list(*columns))
+        lines = []
+        for table, kind in (('posts', 'post'), ('comments', 'comment')):
+            output = os.path.join(self.directory, table)
+            call_command('export_yatube', table, output=output,
+                         stderr=StringIO())
+            with open(output, encoding='utf-8') as rows:
+                lines.extend(json.dumps({**json.loads(row), 'type': kind})
+                             for row in rows)
+        Post.objects.all().delete()
+
+        self.assertEqual(self.run_import(lines), '')
+        self.assertEqual(
+            list(Comment.objects.order_by('pk').values_list(*columns)),
+            threads)
+        self.assertEqual(Comment.objects.get(pk=root.pk).replies_count, 1)
+
+    def test_reply_to_unknown_comment_is_reported(self):
+        errors = self.run_import([
+            json.dumps(RECORDS[0]),
+            json.dumps({'type': 'comment', 'id': 6, 'post': 10,
+                        'parent': 99, 'author': 'ann', 'text': 'Ответ'}),
+            json.dumps({'type': 'comment', 'post': 10, 'parent': 5,
+                        'author': 'ann', 'text': 'Ответ'}),
+        ])
+
+        self.assertIn('Строка 2:', errors)
+        self.assertIn('Строка 3:', errors)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_rerun_does_not_duplicate(self):
+        lines = [json.dumps(record) for record in RECORDS]
+        self.run_import(lines)
+        self.run_import(lines)
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
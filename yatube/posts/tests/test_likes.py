@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import likes, stats
+from ..models import Like, LikeShard, Post
+
+User = get_user_model()
+
+
+@override_settings(LIKE_SHARDS=4)
+class LikeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(text='Запись', author=cls.author)
+        cls.fans = [User.objects.create_user(f'fan{num}')
+                    for num in range(10)]
+
+    def setUp(self):
+        cache.clear()
+
+    def like_all(self):
+        for fan in self.fans:
+            likes.like(fan, self.post.pk)
+
+    def pending(self):
+        return LikeShard.objects.aggregate(total=Sum('count'))['total']
+
+    def test_like_once_per_user(self):
+        self.client.force_login(self.fans[0])
+        url = reverse('posts:post_like', args=(self.post.pk,))
+        self.client.post(url)
+        self.client.post(url)
+
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(self.pending(), 1)
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(self.post.pk,)))
+        self.assertTrue(response.context['post'].liked)
+        self.assertContains(response, 'Больше не нравится')
+
+    def test_unlike(self):
+        self.client.force_login(self.fans[0])
+        self.client.post(reverse('posts:post_like', args=(self.post.pk,)))
+        self.client.post(reverse('posts:post_unlike', args=(self.post.pk,)))
+        self.client.post(reverse('posts:post_unlike', args=(self.post.pk,)))
+
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.pending(), 0)
+
+    def test_likes_are_spread_over_shards(self):
+        self.like_all()
+
+        self.assertLessEqual(LikeShard.objects.count(), 4)
+        self.assertEqual(self.pending(), len(self.fans))
+        post = Post.objects.annotate(pending_likes=likes.pending()).get()
+        self.assertEqual(post.pending_likes, len(self.fans))
+
+    def test_flush_moves_shards_to_post(self):
+        self.like_all()
+        likes.unlike(self.fans[0], self.post.pk)
+        index = self.client.get(reverse('posts:index'))
+
+        self.assertEqual(likes.flush(), 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, len(self.fans) - 1)
+        self.assertFalse(LikeShard.objects.exists())
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotEqual(response.content, index.content)
+        self.assertContains(response, f'Нравится: {len(self.fans) - 1}')
+
+    def test_recount_replaces_shards(self):
+        self.like_all()
+        likes.flush()
+        likes.like(self.author, self.post.pk)
+
+        drift = stats.recount()
+
+        self.assertEqual(drift['likes_count'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, len(self.fans) + 1)
+        self.assertFalse(LikeShard.objects.exists())
+
+    def test_like_requires_post(self):
+        self.client.force_login(self.fans[0])
+        response = self.client.get(reverse('posts:post_like',
+                                           args=(self.post.pk,)))
+        self.assertEqual(response.status_code, 405)
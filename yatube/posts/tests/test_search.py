@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_russian_word_forms(self):
+        words = {
+            'книгами': 'книг',
+            'красивая': 'красив',
+            'вагонов': 'вагон',
+            'важнейшими': 'важн',
+            'улыбнувшись': 'улыбнувш',
+            'собираются': 'собира',
+            'ёлки': 'елк',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+        cls.books = Post.objects.create(
+            text='Читаю книги про книги', author=cls.user)
+        cls.book = Post.objects.create(
+            text='Купил новую книгу', author=cls.user)
+        cls.other = Post.objects.create(
+            text='Гуляли в парке', author=cls.user)
+
+    def find(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_finds_other_word_forms_ranked(self):
+        self.assertEqual(list(self.find('книгами')),
+                         [self.books, self.book])
+
+    def test_empty_query_finds_nothing(self):
+        self.assertEqual(list(self.find('')), [])
+        self.assertEqual(list(self.find('!!!')), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.other.text = 'Гуляли в парке с книгой'
+        self.other.save()
+        self.assertIn(self.other, self.find('книга'))
+
+        self.other.delete()
+        self.assertEqual(len(self.find('книга')), 2)
+
+    def test_results_are_paginated_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(text=f'Заметка №{num}', author=self.user)
+            for num in range(15))
+        search.rebuild()
+
+        first = self.find('заметки')
+        second = self.find('заметки', after=first.next_cursor)
+        self.assertEqual(len(first) + len(second), 15)
+        self.assertFalse(set(first) & set(second))
+        self.assertFalse(second.has_next())
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': 'книгу'})
+        self.assertEqual(set(response.context['cl'].result_list),
+                         {self.books, self.book})
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import storage, thumbnails
+from ..models import Post, ReleasedImage, ThumbnailJob
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name='small.gif'):
+    return SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+
+
+def exists(name):
+    return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_name_is_sharded_content_hash(self):
+        post = Post.objects.create(text='Текст', author=self.user,
+                                   image=upload('Мем.GIF'))
+
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(post.image.name,
+                         f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif')
+        self.assertTrue(exists(post.image.name))
+
+    def test_duplicates_share_blob_and_thumbnails(self):
+        first = Post.objects.create(text='Первая', author=self.user,
+                                    image=upload('one.gif'))
+        call_command('warm_thumbnails', processes=0, stdout=StringIO())
+        second = Post.objects.create(text='Вторая', author=self.user,
+                                     image=upload('two.gif'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(os.path.join(TEMP_MEDIA_ROOT,
+                                                 first.image.name))
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(thumbnails.missing_variants(second.image), [])
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReleaseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('author')
+        self.posts = [Post.objects.create(text=f'Текст №{num}',
+                                          author=self.user, image=upload())
+                      for num in range(2)]
+        self.name = self.posts[0].image.name
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def sweep(self):
+        out = StringIO()
+        call_command('sweep_images', grace=0, stdout=out)
+        return out.getvalue()
+
+    def test_blob_removed_with_last_reference(self):
+        self.posts[0].delete()
+        self.assertIn('Удалено картинок: 0', self.sweep())
+        self.assertTrue(exists(self.name))
+
+        self.posts[1].delete()
+        self.assertIn('Удалено картинок: 1', self.sweep())
+        self.assertFalse(exists(self.name))
+        self.assertFalse(ThumbnailJob.objects.filter(image=self.name).exists())
+        self.assertFalse(ReleasedImage.objects.exists())
+
+    def test_replaced_image_released(self):
+        for post in self.posts:
+            post.image = ''
+            post.save()
+        self.sweep()
+
+        self.assertFalse(exists(self.name))
+
+    def test_blob_reused_by_uncommitted_upload_is_kept(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, self.name)
+        hour_ago = time.time() - 60 * 60
+        os.utime(path, (hour_ago, hour_ago))
+        for post in self.posts:
+            post.delete()
+
+        # the same picture is uploaded, its post is not committed yet
+        name = Post._meta.get_field('image').storage.save(
+            'posts/small.gif', upload())
+        self.assertEqual(name, self.name)
+
+        self.assertEqual(storage.sweep(grace=60), 0)
+        self.assertTrue(exists(self.name))
+        self.assertTrue(ReleasedImage.objects.filter(image=self.name).exists())
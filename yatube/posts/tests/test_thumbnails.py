@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, ThumbnailJob
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Текст с картинкой', author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+
+    def warm(self):
+        call_command('warm_thumbnails', processes=0, stdout=StringIO())
+
+    def test_upload_is_queued_not_rendered(self):
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=self.post.image.name).exists())
+        self.assertEqual(thumbnails.missing_variants(self.post.image.name),
+                         list(settings.THUMBNAIL_VARIANTS))
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+
+    def test_page_with_placeholder_is_not_cached(self):
+        self.client.get(reverse('posts:index'))
+        self.warm()
+
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, 'Картинка обрабатывается')
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_worker_renders_queued_images(self):
+        self.warm()
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertEqual(thumbnails.missing_variants(self.post.image.name),
+                         [])
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_edit_without_new_image_is_not_queued(self):
+        self.warm()
+        self.post.text = 'Новый текст'
+        self.post.save()
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_broken_image_gives_up_after_attempts(self):
+        ThumbnailJob.objects.create(image='posts/missing.jpg')
+        self.warm()
+
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.attempts, settings.THUMBNAIL_MAX_ATTEMPTS)
+
+    def test_decompression_bomb_counts_as_failed_attempt(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 0):
+            self.warm()
+
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.attempts, settings.THUMBNAIL_MAX_ATTEMPTS)
+
+    def test_all_queues_images_without_thumbnails(self):
+        ThumbnailJob.objects.all().delete()
+        call_command('warm_thumbnails', '--all', processes=0,
+                     stdout=StringIO())
+
+        self.assertEqual(thumbnails.missing_variants(self.post.image.name),
+                         [])
+
+    def test_variants_are_stored_with_dimensions(self):
+        self.warm()
+
+        self.post.refresh_from_db()
+        card = json.loads(self.post.image_variants)['card']
+        widths = settings.THUMBNAIL_VARIANTS['card']['widths']
+        self.assertEqual([entry[1] for entry in card['sources']['jpeg']],
+                         list(widths))
+        for name, width, height, size in card['sources']['jpeg']:
+            with self.subTest(width=width):
+                self.assertEqual(height, round(width * 339 / 960))
+                self.assertEqual(default_storage.size(name), size)
+
+    def test_picture_markup_needs_no_files(self):
+        self.warm()
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'thumbnails'))
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, '<picture>')
+        for width in settings.THUMBNAIL_VARIANTS['card']['widths']:
+            with self.subTest(width=width):
+                self.assertContains(response, f'card-{width}.jpg {width}w')
+        self.assertContains(response, 'width="960" height="339"')
+
+    @skipUnless('webp' in thumbnails.formats(), 'Pillow без WebP')
+    def test_modern_formats_go_to_sources(self):
+        self.warm()
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertContains(response, '<source type="image/webp"')
+
+    def test_duplicate_upload_reuses_variants(self):
+        self.warm()
+        duplicate = Post.objects.create(
+            text='Та же картинка', author=self.user,
+            image=SimpleUploadedFile('copy.gif', SMALL_GIF, 'image/gif'))
+
+        duplicate.refresh_from_db()
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertEqual(duplicate.image_variants,
+                         Post.objects.get(pk=self.post.pk).image_variants)
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        self.reader_client.get(reverse('posts:profile_follow',
+                                       args=(self.author,)))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+        self.reader_client.get(reverse('posts:profile_unfollow',
+                                       args=(self.author,)))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        entry = TimelineEntry.objects.get(user=self.reader, post=new_post)
+        self.assertEqual(entry.pub_date, new_post.pub_date)
+
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_hot_author_is_merged_at_read_time(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        # check that posts of a hot author are not fanned out on write
+
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post).exists())
+
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_cooling_down_keeps_posts_written_while_hot(self):
+        other = User.objects.create_user('other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        hot_post = Post.objects.create(text='Горячий пост', author=self.author)
+        self.assertFalse(Post.objects.get(pk=hot_post.pk).fanned_out)
+
+        Follow.objects.filter(user=other).delete()
+
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [hot_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_follow_of_hot_author_backfills_fanned_out_posts(self):
+        for username in ('first', 'second'):
+            Follow.objects.create(user=User.objects.create_user(username),
+                                  author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+        Follow.objects.exclude(user=self.reader).delete()
+
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, POSTSNUM=2)
+    def test_pages_merge_timeline_and_unfanned_posts(self):
+        hot = User.objects.create_user('hot')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=hot)
+        Follow.objects.create(user=User.objects.create_user('other'),
+                              author=hot)
+        posts = [self.old_post]
+        for num in range(6):
+            posts.append(Post.objects.create(
+                text=f'Пост №{num}', author=(hot, self.author)[num % 2]))
+        posts.reverse()
+
+        seen, cursor = [], None
+        while True:
+            page_obj = self.reader_client.get(
+                reverse('posts:follow_index'),
+                {'after': cursor} if cursor else {}).context['page_obj']
+            seen.extend(page_obj)
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, posts)
+
+        response = self.reader_client.get(
+            reverse('posts:follow_index'),
+            {'before': page_obj.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']), posts[-3:-1])
@@ -0,0 +1,134 @@
+import math
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import likes, trending
+from ..models import Comment, Like, Post, TrendingPost, TrendingShard
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.quiet, cls.busy = [
+            Post.objects.create(text=f'Запись №{num}', author=cls.author)
+            for num in range(2)]
+
+    def setUp(self):
+        cache.clear()
+
+    def score(self, post):
+        return TrendingPost.objects.get(post=post).score
+
+    def discuss(self, post, count=3):
+        return [Comment.objects.create(post=post, author=self.reader,
+                                       text='Комментарий')
+                for _ in range(count)]
+
+    def test_events_raise_score_on_refresh(self):
+        before = self.score(self.busy)
+        self.discuss(self.busy)
+        likes.like(self.reader, self.busy.pk)
+
+        trending.refresh()
+
+        self.assertGreater(self.score(self.busy), before)
+        self.assertEqual(
+            list(trending.feed().order_by(*trending.ORDERING)),
+            [self.busy, self.quiet])
+
+    def test_scores_add_up_in_log_space(self):
+        now = timezone.now()
+        post = Post.objects.create(text='Новая', author=self.author)
+        TrendingPost.objects.filter(post=post).delete()
+        trending.record(post.pk, 1, now)
+        trending.record(post.pk, 3, now)
+
+        self.assertAlmostEqual(self.score(post),
+                               trending.point(4, now), places=6)
+
+    def test_likes_and_comments_leave_score_row_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            likes.like(self.reader, self.busy.pk)
+            self.discuss(self.busy, 1)
+            self.client.force_login(self.author)
+            self.client.post(reverse('posts:post_like', args=(self.busy.pk,)))
+
+        self.assertTrue(Like.objects.filter(user=self.author).exists())
+        self.assertEqual([query['sql'] for query in queries.captured_queries
+                          if '"posts_trendingpost"' in query['sql']], [])
+
+    def test_fold_adds_buffered_events(self):
+        before = self.score(self.busy)
+        comment, = self.discuss(self.busy, 1)
+        likes.like(self.reader, self.busy.pk)
+        like = Like.objects.get()
+        self.assertEqual(self.score(self.busy), before)
+
+        self.assertEqual(trending.fold(), 1)
+
+        expected = trending.logaddexp(
+            before, trending.logaddexp(trending.point(2, comment.created),
+                                       trending.point(1, like.created)))
+        self.assertAlmostEqual(self.score(self.busy), expected, places=6)
+        self.assertFalse(TrendingShard.objects.exists())
+
+    def test_refresh_counts_buffered_events_once(self):
+        self.discuss(self.busy)
+        now = timezone.now()
+
+        trending.refresh(now)
+        once = self.score(self.busy)
+        self.assertFalse(TrendingShard.objects.exists())
+        trending.fold()
+        trending.refresh(now)
+
+        self.assertAlmostEqual(self.score(self.busy), once, places=6)
+
+    def test_refresh_takes_back_deleted_events(self):
+        comments = self.discuss(self.busy)
+        trending.refresh()
+        raised = self.score(self.busy)
+        for comment in comments:
+            comment.delete()
+
+        trending.refresh()
+
+        self.assertLess(self.score(self.busy), raised)
+        self.assertAlmostEqual(self.score(self.busy), self.score(self.quiet),
+                               places=3)
+
+    def test_refresh_drops_decayed_posts(self):
+        later = timezone.now() + timedelta(days=30)
+
+        kept, dropped = trending.refresh(later)
+
+        self.assertEqual((kept, dropped), (0, 2))
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_decay_halves_score(self):
+        now = timezone.now()
+        with self.settings(TRENDING_HALF_LIFE=60):
+            fresh = trending.point(1, now)
+            old = trending.point(1, now - timedelta(seconds=60))
+        self.assertAlmostEqual(fresh - old, math.log(2))
+
+    def test_page_is_one_query(self):
+        self.discuss(self.busy, 1)
+        trending.refresh()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:trending'))
+
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.busy, self.quiet])
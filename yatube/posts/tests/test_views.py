@@ -1,18 +1,17 @@
+import hashlib
 import shutil
 import tempfile
-import time
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -124,7 +123,10 @@ class TestPageTemplates(TestCase):
 
         for url in urls:
             with self.subTest(url=url):
-                response = self.authorized_client.get(url + '?page=2')
+                response = self.authorized_client.get(url)
+                next_cursor = response.context['page_obj'].next_cursor
+                response = self.authorized_client.get(
+                    url, {'after': next_cursor})
                 self.assertEqual(len(response.context['page_obj']),
                                  settings.POSTSNUM)
 
@@ -210,7 +212,10 @@ class TestPageTemplates(TestCase):
 
         last_post = Post.objects.order_by('-pk')[0]
         default_upload_path = last_post._meta.get_field('image').upload_to
-        path_to_file = f"{default_upload_path}{uploaded.name}"
+        # files are named by the hash of their content
+        digest = hashlib.sha256(small_gif).hexdigest()
+        path_to_file = (f"{default_upload_path}"
+                        f"{digest[:2]}/{digest[2:4]}/{digest}.gif")
 
         response = self.client.get(reverse('posts:post_detail',
                                            args=(post_with_image.pk,)))
@@ -229,26 +234,88 @@ class TestPageTemplates(TestCase):
                                  path_to_file)
 
     def test_index_page_cache(self):
-        settings.DEBUG = True
-
-        self.client.get(reverse('posts:index'))
-        num_of_db_connections_after_first_request = len(connection.queries)
+        newest_post = Post.objects.first()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, newest_post.text)
 
-        self.client.get(reverse('posts:index'))
-        num_of_db_connections_after_second_request = len(connection.queries)
+        # check that a change bypassing signals is not seen until eviction
 
-        self.assertGreater(num_of_db_connections_after_first_request,
-                           num_of_db_connections_after_second_request)
+        Post.objects.filter(pk=newest_post.pk).update(text='Новый текст')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, newest_post.text)
 
-        # waiting to drop the cache
+        # check that a new post evicts the cached page at once
 
-        time.sleep(20)
+        new_post = Post.objects.create(text='Пост после кэша',
+                                       author=self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, new_post.text)
 
+    def test_authorized_pages_are_not_cached(self):
         self.client.get(reverse('posts:index'))
-        num_of_db_connections_with_cache_reset = len(connection.queries)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'Пользователь: {self.user.username}')
+
+    def test_renamed_author_is_shown_on_cached_cards(self):
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Автор: Переименованный')
+
+    def test_renames_evict_cached_pages(self):
+        post = Post.objects.first()
+        Comment.objects.create(post=post, author=self.follower,
+                               text='Комментарий')
+        urls = (reverse('posts:index'),
+                reverse('posts:profile', args=(self.user,)),
+                reverse('posts:posts_in_group', args=(post.group.slug,)),
+                reverse('posts:post_detail', args=(post.pk,)))
+        for url in urls:
+            self.client.get(url)
+
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        self.follower.username = 'renamed_follower'
+        self.follower.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url),
+                                    'Автор: Переименованный')
+        self.assertContains(self.client.get(urls[-1]), 'renamed_follower')
+
+    def test_group_slug_change_evicts_cached_links(self):
+        group = Post.objects.first().group
+        urls = (reverse('posts:index'),
+                reverse('posts:profile', args=(self.user,)))
+        for url in urls:
+            self.client.get(url)
 
-        self.assertEqual(num_of_db_connections_after_first_request,
-                         num_of_db_connections_with_cache_reset)
+        group.slug = 'renamed'
+        group.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url),
+                                    reverse('posts:posts_in_group',
+                                            args=('renamed',)))
+
+    def test_edit_evicts_every_page_of_feed(self):
+        oldest_post = Post.objects.last()
+        url = reverse('posts:profile', args=(self.user,))
+        cursor = None
+        page_obj = self.client.get(url).context['page_obj']
+        while page_obj.has_next():
+            cursor = page_obj.next_cursor
+            page_obj = self.client.get(url, {'after': cursor}).context[
+                'page_obj']
+        self.assertIn(oldest_post, page_obj)
+
+        oldest_post.text = 'Исправленный текст'
+        oldest_post.save()
+        response = self.client.get(url, {'after': cursor})
+        self.assertContains(response, 'Исправленный текст')
 
     def test_followers_subscription(self):
         response = self.follower_client.get(reverse('posts:follow_index'))
@@ -290,3 +357,131 @@ class TestPageTemplates(TestCase):
 
         response = self.no_follower_client.get(reverse('posts:follow_index'))
         self.assertNotContains(response, last_post)
+
+
+@override_settings(COMMENTSNUM=10)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('commenter')
+        cls.post = Post.objects.create(text='Популярная запись',
+                                       author=cls.user)
+        for num in range(15):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий №{num}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_is_rendered_inline(self):
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(self.post.pk,)))
+        comments = response.context['comments']
+
+        self.assertEqual([comment.text for comment in comments],
+                         [f'Комментарий №{num}' for num in range(10)])
+        self.assertContains(response, reverse('posts:post_comments',
+                                              args=(self.post.pk,)))
+
+    def test_next_page_is_a_fragment(self):
+        first = self.client.get(reverse('posts:post_detail',
+                                        args=(self.post.pk,)))
+        cursor = first.context['comments'].next_cursor
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('posts:post_comments', args=(self.post.pk,)),
+                {'after': cursor})
+
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual([comment.text for comment in response.context[
+            'comments']], [f'Комментарий №{num}' for num in range(10, 15)])
+        self.assertNotContains(response, 'data-comments-url')
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(reverse('posts:post_comments',
+                                           args=(self.post.pk + 1,)))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COMMENT_MAX_DEPTH=3, COMMENT_COLLAPSE_DEPTH=2)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('commenter')
+        cls.post = Post.objects.create(text='Обсуждаемая запись',
+                                       author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def reply(self, text, parent=None, post=None):
+        post = post or self.post
+        return self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': text, 'parent': parent.pk if parent else ''})
+
+    def test_reply_extends_parent_path(self):
+        self.reply('Корень')
+        root = Comment.objects.get(text='Корень')
+        self.reply('Ответ', parent=root)
+
+        reply = Comment.objects.get(text='Ответ')
+        root.refresh_from_db()
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(reply.depth, 1)
+        self.assertTrue(reply.path.startswith(root.path))
+        self.assertEqual(root.replies_count, 1)
+        self.assertEqual(list(root.subtree()), [reply])
+
+    def test_depth_is_limited(self):
+        parent = None
+        for depth in range(3):
+            parent = Comment.objects.create(post=self.post, author=self.user,
+                                            parent=parent, text=f'{depth}')
+        self.reply('Слишком глубоко', parent=parent)
+
+        self.assertFalse(Comment.objects.filter(
+            text='Слишком глубоко').exists())
+
+    def test_parent_from_other_post(self):
+        other = Post.objects.create(text='Другая запись', author=self.user)
+        parent = Comment.objects.create(post=other, author=self.user,
+                                        text='Чужой')
+
+        self.assertEqual(self.reply('Ответ', parent=parent).status_code, 404)
+
+    def test_deep_replies_are_collapsed(self):
+        first = Comment.objects.create(post=self.post, author=self.user,
+                                       text='Первый')
+        answer = Comment.objects.create(post=self.post, author=self.user,
+                                        parent=first, text='Ответ')
+        deep = Comment.objects.create(post=self.post, author=self.user,
+                                      parent=answer, text='Глубокий')
+        second = Comment.objects.create(post=self.post, author=self.user,
+                                        text='Второй')
+
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(self.post.pk,)))
+        self.assertEqual(list(response.context['comments']),
+                         [first, answer, second])
+        replies_url = reverse('posts:comment_replies',
+                              args=(self.post.pk, answer.pk))
+        self.assertContains(response, replies_url)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(replies_url)
+        self.assertEqual(list(response.context['comments']), [deep])
+
+    def test_deleting_comment_removes_thread(self):
+        root = Comment.objects.create(post=self.post, author=self.user,
+                                      text='Корень')
+        Comment.objects.create(post=self.post, author=self.user,
+                               parent=root, text='Ответ')
+        root.delete()
+
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.comments.exists())
+        self.assertEqual(self.post.comments_count, 0)
@@ -0,0 +1,156 @@
+"""Responsive image variants generated ahead of time.
+
+Uploading an image only queues a ``ThumbnailJob``; ``manage.py
+warm_thumbnails`` renders every variant of ``settings.THUMBNAIL_VARIANTS``
+at each of its widths in every format Pillow can encode, and stores the
+names and dimensions on the posts using the image. Templates build
+``<picture>`` markup from that metadata alone, without touching the
+files, and show a placeholder until it exists.
+"""
+import json
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post, ThumbnailJob
+
+# format -> (Pillow format, MIME type, extension, save options)
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', 'avif', {'quality': 50}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 75, 'method': 6}),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg',
+             {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+# every browser decodes it, so it goes into <img>
+FALLBACK = 'jpeg'
+
+
+@lru_cache(maxsize=None)
+def formats():
+    """Configured formats this Pillow build can write, fallback last."""
+    Image.init()
+    supported = [name for name in settings.THUMBNAIL_FORMATS
+                 if name != FALLBACK and FORMATS[name][0] in Image.SAVE]
+    return supported + [FALLBACK]
+
+
+def encode(frame, name):
+    pillow_format, _, _, options = FORMATS[name]
+    if pillow_format == 'JPEG' or 'A' not in frame.getbands():
+        frame = frame.convert('RGB')
+    output = BytesIO()
+    frame.save(output, pillow_format, **options)
+    return output.getvalue()
+
+
+def write(name, content):
+    # names are fixed, re-rendering replaces the old file
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def render_variant(image, picture, variant, options):
+    width, height = options['size']
+    sources = {name: [] for name in formats()}
+    for frame_width in options['widths']:
+        frame_height = round(frame_width * height / width)
+        frame = ImageOps.fit(picture, (frame_width, frame_height),
+                             Image.LANCZOS)
+        for name in formats():
+            content = encode(frame, name)
+            path = (f'thumbnails/{image}/{variant}-{frame_width}.'
+                    f'{FORMATS[name][2]}')
+            write(path, content)
+            sources[name].append([path, frame_width, frame_height,
+                                  len(content)])
+    return {'width': width, 'height': height, 'sources': sources}
+
+
+def render(image):
+    storage = Post._meta.get_field('image').storage
+    with storage.open(image) as source, Image.open(source) as picture:
+        picture = ImageOps.exif_transpose(picture)
+        if picture.mode not in ('RGB', 'RGBA'):
+            picture = picture.convert('RGBA')
+        return {variant: render_variant(image, picture, variant, options)
+                for variant, options in settings.THUMBNAIL_VARIANTS.items()}
+
+
+def stored(image):
+    """Variant metadata already saved for ``image`` by any post."""
+    variants = (Post.objects.filter(image=image).exclude(image_variants='')
+                .values_list('image_variants', flat=True).first())
+    return json.loads(variants) if variants else {}
+
+
+def missing_variants(image):
+    variants = stored(image)
+    return [variant for variant in settings.THUMBNAIL_VARIANTS
+            if variant not in variants]
+
+
+def generate(image):
+    """Render every variant of ``image``, return the ones that failed."""
+    try:
+        variants = render(image)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        return list(settings.THUMBNAIL_VARIANTS)
+    Post.objects.filter(image=image).update(
+        image_variants=json.dumps(variants, separators=(',', ':')))
+    return []
+
+
+def enqueue(image):
+    """Queue ``image`` unless a duplicate upload already has variants."""
+    if not image:
+        return
+    variants = stored(image)
+    if any(variant not in variants
+           for variant in settings.THUMBNAIL_VARIANTS):
+        ThumbnailJob.objects.get_or_create(image=image)
+    else:
+        Post.objects.filter(image=image, image_variants='').update(
+            image_variants=json.dumps(variants, separators=(',', ':')))
+
+
+def delete(image):
+    directory = f'thumbnails/{image}'
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f'{directory}/{name}')
+
+
+def srcset(entries):
+    return ', '.join(f'{default_storage.url(name)} {width}w'
+                     for name, width, _, _ in entries)
+
+
+def picture(post, variant):
+    """``<picture>`` data for ``variant`` of the post image, or None."""
+    if not post.image_variants:
+        return None
+    data = json.loads(post.image_variants).get(variant)
+    if data is None:
+        return None
+    sources = data['sources']
+    fallback = sources.get(FALLBACK) or []
+    if not fallback:
+        return None
+    return {
+        'sources': [{'type': FORMATS[name][1], 'srcset': srcset(entries)}
+                    for name, entries in sources.items()
+                    if name != FALLBACK and entries],
+        'src': default_storage.url(fallback[-1][0]),
+        'srcset': srcset(fallback),
+        'sizes': settings.THUMBNAIL_VARIANTS[variant]['sizes'],
+        'width': data['width'],
+        'height': data['height'],
+    }
@@ -0,0 +1,144 @@
+"""Materialized follow feed.
+
+New posts are pushed into every follower's timeline at write time, so a
+page of the follow feed is a keyset range read over
+``TimelineEntry(user, pub_date, post)``. Posts of authors with more than
+``settings.TIMELINE_FANOUT_LIMIT`` followers are not fanned out and keep
+``Post.fanned_out`` unset; ``FeedPaginator`` merges in a page of them per
+followed author that has any, whatever the author's followers count is by
+then. A new follower gets the fanned out posts of the author backfilled.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef
+
+from core.paginator import CursorPaginator
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+# the columns of the timeline index, equal to the post's pub_date and id
+TIMELINE_ORDERING = ('-timeline_date', '-timeline_post')
+POST_ORDERING = ('-pub_date', '-id')
+
+
+def timeline_posts(posts, user):
+    """``posts`` in the timeline of ``user``, to be ordered by
+    ``TIMELINE_ORDERING``."""
+    return (posts.filter(timeline_entries__user=user)
+            .annotate(timeline_date=F('timeline_entries__pub_date'),
+                      timeline_post=F('timeline_entries__post')))
+
+
+def unfanned_authors(user):
+    """Authors followed by ``user`` with posts that were not fanned out."""
+    return (Follow.objects.filter(user=user)
+            .annotate(unfanned=Exists(Post.objects.filter(
+                author=OuterRef('author'), fanned_out=False)))
+            .filter(unfanned=True).values_list('author', flat=True))
+
+
+def unfanned_posts(posts, author_id):
+    return posts.filter(author_id=author_id, fanned_out=False)
+
+
+def is_hot(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).exists()
+
+
+def sort_key(row):
+    if isinstance(row, dict):
+        return row['pub_date'], row['id']
+    return row.pub_date, row.pk
+
+
+class FeedPaginator(CursorPaginator):
+    """Follow feed of ``user`` over the posts of ``object_list``, which may
+    be a ``values()`` queryset with ``pub_date`` and ``id``.
+
+    The timeline and the posts of every author that were not fanned out
+    are each read with a keyset query of ``per_page + 1`` rows, none of
+    them sorts more than it returns, and the pages are merged.
+    """
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING, *,
+                 user):
+        super().__init__(object_list, per_page, ordering)
+        self.user = user
+
+    def sources(self, position=None, forward=True):
+        yield CursorPaginator(
+            timeline_posts(self.object_list, self.user), self.per_page,
+            TIMELINE_ORDERING).page_queryset(position, forward)
+        for author_id in unfanned_authors(self.user):
+            yield CursorPaginator(
+                unfanned_posts(self.object_list, author_id), self.per_page,
+                POST_ORDERING).page_queryset(position, forward)
+
+    def fetch(self, position, forward):
+        rows = [row for source in self.sources(position, forward)
+                for row in source]
+        rows.sort(key=sort_key, reverse=self.descending == forward)
+        return rows[:self.per_page + 1]
+
+
+def fan_out(post):
+    if is_hot(post.author_id):
+        post.fanned_out = False
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        return
+    followers = (Follow.objects
+                 .filter(author_id=post.author_id, user__isnull=False)
+                 .values_list('user_id', flat=True)
+                 .iterator(chunk_size=BATCH_SIZE))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author):
+    # the rest is merged at read time
+    posts = (Post.objects.filter(author=author, fanned_out=True)
+             .values_list('pk', 'pub_date')
+             .iterator(chunk_size=BATCH_SIZE))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user, author):
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild():
+    """Rebuild every timeline, for bulk loads that bypass signals."""
+    TimelineEntry.objects.all().delete()
+    hot = UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT).values('user')
+    Post.objects.update(fanned_out=True)
+    Post.objects.filter(author__in=hot).update(fanned_out=False)
+    follows = list(Follow.objects
+                   .filter(user__isnull=False, author__isnull=False)
+                   .exclude(author__in=hot)
+                   .order_by('author')
+                   .values_list('author_id', 'user_id'))
+    for author_id, rows in groupby(follows, key=itemgetter(0)):
+        followers = [user_id for _, user_id in rows]
+        posts = list(Post.objects.filter(author_id=author_id)
+                     .values_list('pk', 'pub_date'))
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for user_id in followers for pk, pub_date in posts),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
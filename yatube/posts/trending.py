@@ -0,0 +1,230 @@
+"""Trending posts ranked by time-decayed activity.
+
+A post scores the sum of its events: the publication, comments and likes,
+each worth ``settings.TRENDING_WEIGHTS[kind]`` and halving every
+``settings.TRENDING_HALF_LIFE`` seconds; the publication weighs more for
+authors with more followers. Decay scales every score by the same factor,
+so the order only changes with new events. ``TrendingPost.score`` keeps
+``ln(sum(weight * e^(rate * t)))`` with ``t`` counted from ``EPOCH``:
+a new post is recorded with one ``logaddexp`` on its own row, and the feed
+reads the ``score`` index, however many posts there are.
+
+Comments and likes do not touch the score row: a burst of them on a hot
+post would queue on its lock, as likes are sharded to avoid. Each event
+is ``logaddexp``-ed into one of ``settings.TRENDING_SHARDS``
+``TrendingShard`` rows picked at random instead, and ``fold``
+(``manage.py refresh_trending --fold``) adds the shards to the scores.
+``refresh`` (``manage.py refresh_trending``) rescores posts with activity
+inside ``settings.TRENDING_WINDOW`` from hourly aggregates of their events,
+read from the date indexes in batches, which also takes back deleted
+comments and likes, and drops posts whose decayed score fell below
+``settings.TRENDING_MIN_SCORE``. The recount covers the events buffered
+for its posts, so their shards are deleted with it.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Exp, Ln, TruncHour
+from django.utils import timezone
+
+from . import cache
+from .models import (Comment, Like, Post, TrendingPost, TrendingShard,
+                     UserStats)
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 500
+# the post key of the score index breaks ties
+ORDERING = ('-score', '-trending_id')
+
+
+def exponent(when):
+    rate = math.log(2) / settings.TRENDING_HALF_LIFE
+    return rate * (when - EPOCH).total_seconds()
+
+
+def point(weight, when):
+    """An event worth ``weight`` at ``when`` in score space."""
+    return math.log(weight) + exponent(when)
+
+
+def logaddexp(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def floor(now):
+    """Posts scoring below it have decayed under the minimum."""
+    return math.log(settings.TRENDING_MIN_SCORE) + exponent(now)
+
+
+def post_weight(followers):
+    return settings.TRENDING_WEIGHTS['post'] * (1 + math.log1p(followers))
+
+
+def record(post_id, weight, when=None):
+    """Add an event worth ``weight`` to the score of the post."""
+    value = point(weight, when or timezone.now())
+    with transaction.atomic():
+        row = (TrendingPost.objects.select_for_update()
+               .filter(post_id=post_id).first())
+        if row is None:
+            try:
+                with transaction.atomic():
+                    TrendingPost.objects.create(post_id=post_id, score=value)
+                return
+            except IntegrityError:
+                # created by a concurrent event
+                row = TrendingPost.objects.select_for_update().get(
+                    post_id=post_id)
+        row.score = logaddexp(row.score, value)
+        row.save(update_fields=['score'])
+
+
+def record_post(post):
+    followers = (UserStats.objects.filter(user_id=post.author_id)
+                 .values_list('followers_count', flat=True).first())
+    record(post.pk, post_weight(followers or 0), post.pub_date)
+
+
+def add_to_shard(post_id, weight, when=None):
+    """Buffer an event worth ``weight`` until the next ``fold``."""
+    value = point(weight, when or timezone.now())
+    shard = random.randrange(settings.TRENDING_SHARDS)
+    shards = TrendingShard.objects.filter(post_id=post_id, shard=shard)
+    # logaddexp in SQL; a shard holds minutes of events, so the exponent
+    # stays near zero
+    if shards.update(score=Ln(Exp(F('score') - value) + 1) + value):
+        return
+    try:
+        with transaction.atomic():
+            TrendingShard.objects.create(post_id=post_id, shard=shard,
+                                         score=value)
+    except IntegrityError:
+        # created by a concurrent event
+        shards.update(score=Ln(Exp(F('score') - value) + 1) + value)
+
+
+def fold():
+    """Add the buffered events to the scores, return posts updated."""
+    updated = 0
+    while True:
+        post_ids = list(TrendingShard.objects.order_by('post_id')
+                        .values_list('post_id', flat=True)
+                        .distinct()[:BATCH_SIZE])
+        if not post_ids:
+            break
+        with transaction.atomic():
+            # the score rows first, in the order rescore takes them
+            rows = {row.post_id: row for row in TrendingPost.objects
+                    .select_for_update().filter(post_id__in=post_ids)}
+            shards = list(TrendingShard.objects.select_for_update()
+                          .filter(post_id__in=post_ids))
+            deltas = {}
+            for shard in shards:
+                deltas[shard.post_id] = (
+                    logaddexp(deltas[shard.post_id], shard.score)
+                    if shard.post_id in deltas else shard.score)
+            for post_id, delta in deltas.items():
+                if post_id in rows:
+                    rows[post_id].score = logaddexp(rows[post_id].score,
+                                                    delta)
+            TrendingPost.objects.bulk_update(
+                [rows[pk] for pk in deltas if pk in rows], ['score'],
+                batch_size=BATCH_SIZE)
+            TrendingPost.objects.bulk_create(
+                [TrendingPost(post_id=pk, score=delta)
+                 for pk, delta in deltas.items() if pk not in rows],
+                batch_size=BATCH_SIZE, ignore_conflicts=True)
+            TrendingShard.objects.filter(
+                pk__in=[shard.pk for shard in shards]).delete()
+        updated += len(deltas)
+    if updated:
+        cache.bump(['trending'])
+    return updated
+
+
+def candidates(since):
+    """Posts with an event since ``since``, read from date indexes, and
+    posts with buffered events."""
+    ids = set(Post.objects.filter(pub_date__gte=since)
+              .values_list('pk', flat=True))
+    ids.update(TrendingShard.objects.values_list('post_id', flat=True)
+               .distinct())
+    for model in (Comment, Like):
+        ids.update(model.objects.filter(created__gte=since)
+                   .values_list('post_id', flat=True).distinct())
+    ids.discard(None)
+    return sorted(ids)
+
+
+def scores(post_ids, since, now):
+    points = {}
+    posts = (Post.objects.filter(pk__in=post_ids, pub_date__gte=since)
+             .values_list('pk', 'pub_date', 'author__stats__followers_count'))
+    for pk, pub_date, followers in posts:
+        points.setdefault(pk, []).append(
+            point(post_weight(followers or 0), pub_date))
+    half_hour = timedelta(minutes=30)
+    for model, kind in ((Comment, 'comment'), (Like, 'like')):
+        hours = (model.objects
+                 .filter(post_id__in=post_ids, created__gte=since)
+                 .annotate(hour=TruncHour('created')).order_by()
+                 .values('post_id', 'hour').annotate(total=Count('pk'))
+                 .values_list('post_id', 'hour', 'total'))
+        for pk, hour, total in hours:
+            # an hour of events counts as if all came in the middle of it
+            points.setdefault(pk, []).append(point(
+                total * settings.TRENDING_WEIGHTS[kind],
+                min(hour + half_hour, now)))
+    return {pk: reduce(logaddexp, values) for pk, values in points.items()}
+
+
+def rescore(post_ids, since, now):
+    """Recompute the scores of a batch, return how many stay."""
+    with transaction.atomic():
+        # events of the batch wait until the new scores are in
+        existing = set(TrendingPost.objects.select_for_update()
+                       .filter(post_id__in=post_ids)
+                       .values_list('post_id', flat=True))
+        # the recount below reads the events the shards hold
+        TrendingShard.objects.filter(post_id__in=post_ids).delete()
+        limit = floor(now)
+        alive = {pk: score
+                 for pk, score in scores(post_ids, since, now).items()
+                 if score >= limit}
+        TrendingPost.objects.filter(
+            post_id__in=existing.difference(alive)).delete()
+        TrendingPost.objects.bulk_update(
+            [TrendingPost(post_id=pk, score=alive[pk])
+             for pk in existing.intersection(alive)], ['score'],
+            batch_size=BATCH_SIZE)
+        TrendingPost.objects.bulk_create(
+            [TrendingPost(post_id=pk, score=score)
+             for pk, score in alive.items() if pk not in existing],
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(alive)
+
+
+def refresh(now=None):
+    """Rescore active posts and drop decayed ones, return both counts."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    post_ids = candidates(since)
+    kept = sum(rescore(post_ids[start:start + BATCH_SIZE], since, now)
+               for start in range(0, len(post_ids), BATCH_SIZE))
+    dropped, _ = TrendingPost.objects.filter(score__lt=floor(now)).delete()
+    cache.bump(['trending'])
+    return kept, dropped
+
+
+def feed():
+    """Trending posts, to be ordered by ``ORDERING``."""
+    return (Post.objects
+            .annotate(score=F('trending__score'),
+                      trending_id=F('trending__post'))
+            .filter(score__isnull=False))
@@ -0,0 +1,65 @@
+"""Checks of uploaded images that read headers only.
+
+The format is taken from the magic bytes before Pillow sees the file, and
+the dimensions come from the header Pillow parses lazily, so a
+decompression bomb is refused before a single pixel is decoded. Only a
+JPEG rotated by its EXIF orientation is decoded, once, to store it
+upright without the EXIF block.
+"""
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+EXIF_ORIENTATION = 0x0112
+
+
+def sniff(upload):
+    """Image format by the first bytes of ``upload`` or None."""
+    upload.seek(0)
+    head = upload.read(12)
+    upload.seek(0)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, image_format in SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+def check(upload):
+    """Error message for a file that must not reach Pillow, or None."""
+    if upload.size > settings.UPLOAD_MAX_SIZE:
+        return f'Файл больше {filesizeformat(settings.UPLOAD_MAX_SIZE)}'
+    if sniff(upload) is None:
+        return 'Загрузите картинку в формате JPEG, PNG, GIF или WebP'
+    return None
+
+
+def too_large(image):
+    width, height = image.size
+    return width * height > settings.IMAGE_MAX_PIXELS
+
+
+def normalize_orientation(upload):
+    """``upload`` turned upright if its EXIF says so, EXIF dropped."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image.format != 'JPEG' or image.getexif().get(
+                EXIF_ORIENTATION, 1) == 1:
+            upload.seek(0)
+            return upload
+        upright = ImageOps.exif_transpose(image)
+        result = TemporaryUploadedFile(upload.name, upload.content_type,
+                                       0, None)
+        upright.save(result, 'JPEG', quality=90,
+                     icc_profile=image.info.get('icc_profile'))
+    result.size = result.tell()
+    result.seek(0)
+    return result
@@ -1,19 +1,30 @@
 from django.urls import path
 
-from .views import (add_comment, follow_index, group_posts, index, post_create,
-                    post_detail, post_edit, profile, profile_follow,
-                    profile_unfollow)
+from .views import (add_comment, comment_replies, export, follow_index,
+                    group_posts, index, post_comments, post_create,
+                    post_detail, post_edit, post_like, post_search,
+                    post_unlike, profile, profile_follow, profile_unfollow,
+                    trending_posts)
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', index, name='index'),
+    path('search/', post_search, name='search'),
+    path('trending/', trending_posts, name='trending'),
     path('group/<slug:slug>/', group_posts, name='posts_in_group'),
     path('profile/<str:username>/', profile, name='profile'),
     path('posts/<int:post_id>/', post_detail, name='post_detail'),
     path('create/', post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', add_comment, name='add_comment'),
+    path('posts/<int:post_id>/comments/', post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/replies/',
+         comment_replies, name='comment_replies'),
+    path('posts/<int:post_id>/like/', post_like, name='post_like'),
+    path('posts/<int:post_id>/unlike/', post_unlike, name='post_unlike'),
+    path('export/<str:table>/', export, name='export'),
     path('follow/', follow_index, name='follow_index'),
     path('profile/<str:username>/follow/', profile_follow,
          name='profile_follow'),
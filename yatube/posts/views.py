@@ -1,17 +1,30 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import (get_object_or_404, redirect, render)
+from django.views.decorators.http import require_POST
 
+from core.paginator import CursorPaginator
+
+from . import likes, search, timeline, trending
+from .export import FORMATS, TABLES, Export
+from .cache import cache_feed, conditional_feed, shared_cache_control
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Like, Post, User
 
 
+@shared_cache_control
+@conditional_feed(lambda request: ['index'])
+@cache_feed(lambda: ['index'])
 def index(request):
-    posts = Post.objects.select_related('group')
-    paginator = Paginator(posts, settings.POSTSNUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    paginator = CursorPaginator(posts, settings.POSTSNUM)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
     context = {
         'title': 'Последние обновления на сайте',
         'page_obj': page_obj,
@@ -21,12 +34,35 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@shared_cache_control
+@conditional_feed(lambda request: ['trending'])
+@cache_feed(lambda: ['trending'])
+def trending_posts(request):
+    posts = trending.feed().select_related('author', 'group')
+    paginator = CursorPaginator(posts, settings.POSTSNUM,
+                                ordering=trending.ORDERING)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
+    context = {
+        'title': 'Популярные записи',
+        'page_obj': page_obj,
+        'trending': True,
+    }
+    return render(request, 'posts/index.html', context)
+
+
+@shared_cache_control
+@conditional_feed(lambda request, slug: [f'group:{slug}'])
+@cache_feed(lambda slug: [f'group:{slug}'])
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts_in_group = group.posts.all()
-    paginator = Paginator(posts_in_group, settings.POSTSNUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_in_group = Post.objects.filter(group__slug=slug).select_related(
+        'author', 'group')
+    paginator = CursorPaginator(posts_in_group, settings.POSTSNUM)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
+    # the group comes with the rows, only an empty page looks it up
+    group = (page_obj[0].group if page_obj
+             else get_object_or_404(Group, slug=slug))
     context = {
         'title': group.title,
         'group': group,
@@ -35,44 +71,125 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@shared_cache_control
+@conditional_feed(lambda request, username: [f'profile:{username}'])
+@cache_feed(lambda username: [f'profile:{username}'])
 def profile(request, username):
-    following = False
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    posts_count = len(posts)
-    paginator = Paginator(posts, settings.POSTSNUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    if (request.user.is_authenticated and request.user.follower.
-            filter(author=author).exists()):
-        following = True
+    authors = User.objects.select_related('stats')
+    if request.user.is_authenticated:
+        # follow state rides along with the author lookup
+        authors = authors.annotate(is_followed=Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))))
+    author = get_object_or_404(authors, username=username)
+    posts = author.posts.select_related('author', 'group')
+    paginator = CursorPaginator(posts, settings.POSTSNUM)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
 
     context = {
         'title': f'Профайл пользователя {author}',
         'page_obj': page_obj,
         'author': author,
-        'following': following,
-        'posts_count': posts_count,
+        'following': getattr(author, 'is_followed', False),
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.search(Post.objects.select_related('author', 'group'),
+                          query)
+    paginator = CursorPaginator(posts, settings.POSTSNUM,
+                                ordering=search.ORDERING)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def get_post(request, post_id):
+    """The post with everything its page shows, fetched once per request
+    for the ETag and the page itself."""
+    if not hasattr(request, '_detail_post'):
+        posts = (Post.objects.select_related('author__stats', 'group')
+                 .annotate(pending_likes=likes.pending()))
+        if request.user.is_authenticated:
+            posts = posts.annotate(liked=Exists(Like.objects.filter(
+                user=request.user, post=OuterRef('pk'))))
+        request._detail_post = posts.filter(pk=post_id).first()
+    return request._detail_post
+
+
+def post_scopes(request, post_id):
+    post = get_post(request, post_id)
+    if post is None:
+        return None
+    scopes = [f'post:{post.pk}', f'profile:{post.author.username}']
+    return scopes + [f'group:{post.group.slug}'] if post.group else scopes
+
+
+# no Last-Modified: likes, the viewer's like and deleted comments change
+# the page without a date to show for it, the ETag covers them
+@shared_cache_control
+@conditional_feed(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_post(request, post_id)
+    if post is None:
+        raise Http404
     form = CommentForm(request.POST or None)
+    comments = post.comments.filter(
+        depth__lt=settings.COMMENT_COLLAPSE_DEPTH)
     context = {
         'post': post,
-        'comments': comments,
+        'comments': comments_page(request, comments),
         'form': form,
     }
 
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, comments):
+    """A page of threads in depth-first order, one range of the
+    ``(post, path)`` index."""
+    paginator = CursorPaginator(comments.select_related('author'),
+                                settings.COMMENTSNUM, ordering=('path',))
+    return paginator.get_page(request.GET.get('after'))
+
+
+@shared_cache_control
+@conditional_feed(lambda request, post_id: [f'post:{post_id}'])
+@cache_feed(lambda post_id: [f'post:{post_id}'])
+def post_comments(request, post_id):
+    """The comments after the ``after`` cursor, as an HTML fragment
+    for the post page to append."""
+    comments = Comment.objects.filter(
+        post_id=post_id, depth__lt=settings.COMMENT_COLLAPSE_DEPTH)
+    page_obj = comments_page(request, comments)
+    if not page_obj:
+        get_object_or_404(Post, pk=post_id)
+    return render(request, 'includes/comments.html',
+                  {'comments': page_obj, 'more_url': request.path})
+
+
+@shared_cache_control
+@conditional_feed(lambda request, post_id, comment_id: [f'post:{post_id}'])
+@cache_feed(lambda post_id, comment_id: [f'post:{post_id}'])
+def comment_replies(request, post_id, comment_id):
+    """A collapsed thread: replies under a comment at any depth."""
+    comment = get_object_or_404(Comment, pk=comment_id, post_id=post_id)
+    return render(request, 'includes/comments.html', {
+        'comments': comments_page(request, comment.subtree()),
+        'more_url': request.path,
+    })
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
@@ -114,9 +231,13 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(request.POST or None)
+    parent_id = request.POST.get('parent', '')
+    parent = (get_object_or_404(Comment, pk=parent_id, post=post)
+              if parent_id.isdigit() else None)
+    form = CommentForm(request.POST or None, parent=parent)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -125,12 +246,30 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@login_required
+@require_POST
+@transaction.atomic
+def post_like(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    likes.like(request.user, post_id)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+@transaction.atomic
+def post_unlike(request, post_id):
+    likes.unlike(request.user, post_id)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.POSTSNUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    paginator = timeline.FeedPaginator(posts, settings.POSTSNUM,
+                                       user=request.user)
+    page_obj = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
     title = 'Ваши подписки'
     context = {
         'title': title,
@@ -141,6 +280,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -150,8 +290,28 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     following = request.user.follower.filter(author=author)
     following.delete()
     return redirect('posts:profile', username)
+
+
+@staff_member_required
+def export(request, table):
+    output_format = request.GET.get('format', 'ndjson')
+    if table not in TABLES or output_format not in FORMATS:
+        raise Http404
+    after_id = request.GET.get('after_id', '')
+    try:
+        since = parse_datetime(request.GET.get('since', ''))
+    except ValueError:
+        since = None
+    rows = Export(table, output_format, since=since,
+                  after_id=int(after_id) if after_id.isdigit() else None,
+                  compress='gzip' in request.GET)
+    response = StreamingHttpResponse(rows, content_type=rows.content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{rows.filename}"')
+    return response
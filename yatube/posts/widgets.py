@@ -0,0 +1,39 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+
+
+class AutocompleteSelect(forms.Select):
+    """Select rendering only the empty and the chosen option.
+
+    The rest is fetched while typing from ``url`` by
+    ``includes/autocomplete.html``, so the form does not grow with the
+    related table.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__({'data-autocomplete-url': url, **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        choices = []
+        if iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        selected = [pk for pk in value if pk]
+        if selected:
+            try:
+                choices.extend(iterator.choice(obj) for obj in
+                               iterator.queryset.filter(pk__in=selected))
+            except (ValueError, ValidationError):
+                # an invalid pk was posted, the field reports it
+                pass
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
+class GroupSelect(AutocompleteSelect):
+    def __init__(self, attrs=None):
+        super().__init__(reverse_lazy('api:group_autocomplete'), attrs)
@@ -0,0 +1,30 @@
+"""Authentication backend that keeps logged-in users in the cache.
+
+``AuthenticationMiddleware`` loads ``request.user`` on every request; this
+backend serves it from the cache named by ``settings.USER_CACHE_ALIAS`` and
+``users.signals`` drops the entry whenever the row changes, so a new
+password still invalidates sessions. Every worker must share that cache,
+see ``core.checks``.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = user_cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache().set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,103 @@
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..backends import user_key
+
+User = get_user_model()
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('some_user', password='Pa55word!')
+        self.client.force_login(self.user)
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query['sql'] for query in queries.captured_queries
+                if '"auth_user"' in query['sql']
+                or '"django_session"' in query['sql']]
+
+    def test_repeated_requests_skip_session_and_user_queries(self):
+        url = reverse('about:author')
+        self.client.get(url)
+
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_sessions_of_the_plain_backend_stay_logged_in(self):
+        session = self.client.session
+        session[BACKEND_SESSION_KEY] = (
+            'django.contrib.auth.backends.ModelBackend')
+        session.save()
+
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_profile_change_is_visible(self):
+        self.client.get(reverse('about:author'))
+        self.user.first_name = 'Лев'
+        self.user.save()
+
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.wsgi_request.user.first_name, 'Лев')
+
+    def test_password_change_keeps_own_session_only(self):
+        other = self.client_class()
+        other.force_login(self.user)
+        other.get(reverse('about:author'))
+
+        response = self.client.post(reverse('users:password_change'), {
+            'old_password': 'Pa55word!',
+            'new_password1': 'N3w-pa55word!',
+            'new_password2': 'N3w-pa55word!',
+        })
+
+        self.assertRedirects(response, reverse('users:password_change_done'))
+        self.assertTrue(self.client.get(
+            reverse('about:author')).wsgi_request.user.is_authenticated)
+        self.assertFalse(other.get(
+            reverse('about:author')).wsgi_request.user.is_authenticated)
+
+    def test_password_change_reaches_other_workers(self):
+        # a cache instance of its own, as in another worker process
+        other_worker = FileBasedCache(caches['shared']._dir, {})
+        self.client.get(reverse('about:author'))
+        self.assertIsNotNone(other_worker.get(user_key(self.user.pk)))
+
+        self.client.post(reverse('users:password_change'), {
+            'old_password': 'Pa55word!',
+            'new_password1': 'N3w-pa55word!',
+            'new_password2': 'N3w-pa55word!',
+        })
+
+        self.assertIsNone(other_worker.get(user_key(self.user.pk)))
+
+    def test_logout_reaches_other_workers(self):
+        other_worker = FileBasedCache(caches['shared']._dir, {})
+        self.client.get(reverse('about:author'))
+        session_key = KEY_PREFIX + self.client.session.session_key
+        self.assertIsNotNone(other_worker.get(session_key))
+
+        self.client.get(reverse('users:logout'))
+
+        self.assertIsNone(other_worker.get(session_key))
+
+    def test_login_and_logout(self):
+        self.client.logout()
+        response = self.client.post(reverse('users:login'), {
+            'username': 'some_user', 'password': 'Pa55word!'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.client.get(
+            reverse('about:author')).wsgi_request.user.is_authenticated)
+
+        self.client.get(reverse('users:logout'))
+        self.assertFalse(self.client.get(
+            reverse('about:author')).wsgi_request.user.is_authenticated)
@@ -48,7 +48,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'debug_toolbar',
-    'sorl.thumbnail',
 
     'about.apps.AboutConfig',
     'posts.apps.PostsConfig',
@@ -57,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,7 +73,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIRS = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIRS],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -103,6 +103,25 @@ DATABASES = {
 }
 
 
+# ModelBackend stays after the cached one for sessions saved before it:
+# they name the backend that logged them in and are dropped otherwise.
+# Logins go to the first backend, so those sessions move over with time.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Sessions are read from the cache and written through to the database,
+# only when they change. The cache is shared, or a logout would leave the
+# session alive on every other worker
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+SESSION_CACHE_ALIAS = 'shared'
+
+SESSION_SAVE_EVERY_REQUEST = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -145,6 +164,16 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads always go to a temporary file and are cut off after
+# UPLOAD_MAX_SIZE bytes; images above IMAGE_MAX_PIXELS are refused from
+# their header, before anything is decoded
+
+FILE_UPLOAD_HANDLERS = ['core.uploads.BoundedTemporaryFileUploadHandler']
+
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+IMAGE_MAX_PIXELS = 25_000_000
+
 # Redirect settings
 
 LOGIN_URL = 'users:login'
@@ -161,6 +190,42 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTSNUM = 10
 
+COMMENTSNUM = 20
+
+# Replies nest at most COMMENT_MAX_DEPTH levels; the post page shows the
+# first COMMENT_COLLAPSE_DEPTH levels and loads deeper ones on demand
+
+COMMENT_MAX_DEPTH = 5
+
+COMMENT_COLLAPSE_DEPTH = 2
+
+# Likes are counted in this many rows per post and folded into the post by
+# `manage.py flush_likes`; more shards mean less lock contention on hot posts
+
+LIKE_SHARDS = 8
+
+# Trending posts: events halve in weight every TRENDING_HALF_LIFE seconds.
+# Comments and likes wait in TRENDING_SHARDS rows per post until
+# `manage.py refresh_trending --fold` adds them to the scores, run it every
+# minute; `manage.py refresh_trending` rescores posts active within
+# TRENDING_WINDOW seconds and drops those decayed below TRENDING_MIN_SCORE,
+# run it every few minutes. The trending page is cached until either runs
+
+TRENDING_SHARDS = 8
+
+TRENDING_HALF_LIFE = 6 * 60 * 60
+
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+
+TRENDING_WEIGHTS = {'post': 1, 'comment': 2, 'like': 1}
+
+TRENDING_MIN_SCORE = 0.1
+
+# Follow feed settings: authors with more followers than this are merged
+# into the feed at read time instead of being fanned out on write
+
+TIMELINE_FANOUT_LIMIT = 1000
+
 # Debug toolbar settings
 
 INTERNAL_IPS = [
@@ -175,6 +240,86 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.metrics.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Entries every worker must agree on, such as feed versions, sessions
+    # and users: a change handled by one worker is invisible to the others
+    # in a per-process cache, see core.checks. Files are shared by the workers
+    # of one host; use Memcached when serving from several hosts
+    'shared': {
+        'BACKEND': 'core.metrics.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Anonymous feed pages are invalidated by signals, the timeout only
+# bounds the lifetime of pages nobody asks for
+
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# The versions of feeds, which also make their ETags
+
+FEED_VERSION_CACHE_ALIAS = 'shared'
+
+# request.user is cached by users.backends and dropped when the user is
+# saved or deleted, in a shared cache so that every worker drops it
+
+USER_CACHE_ALIAS = 'shared'
+
+USER_CACHE_TIMEOUT = 60 * 60
+
+# How long a CDN may serve anonymous pages without revalidating
+
+CDN_CACHE_TIMEOUT = 60
+
+# Image variants are rendered by `manage.py warm_thumbnails`, never inside
+# a request; templates ask for variants by name. Every variant is cropped
+# to `size` and rendered at each of `widths` for srcset; `sizes` is the
+# layout width hint for the browser. Formats Pillow cannot write are
+# skipped, JPEG is always rendered as the fallback.
+
+THUMBNAIL_VARIANTS = {
+    'card': {
+        'size': (960, 339),
+        'widths': (320, 640, 960),
+        'sizes': '(max-width: 960px) 100vw, 960px',
+    },
+}
+
+THUMBNAIL_FORMATS = ('avif', 'webp', 'jpeg')
+
+THUMBNAIL_MAX_ATTEMPTS = 3
+
+# Image blobs nothing refers to are deleted by `manage.py sweep_images`,
+# run it every hour or so; a blob reused by an upload within this many
+# seconds is kept, as the post using it may not be committed yet
+
+IMAGE_RELEASE_GRACE = 60 * 60
+
+# Request metrics, served in the Prometheus text format at /metrics/
+
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+SLOW_REQUEST_THRESHOLD = 0.5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
 }